@@ -0,0 +1,261 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2016 Hewlett Packard Enterprise Development LP
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""
+Agent that serves the requests of the node from inside of its container.
+
+Every ``docker exec`` costs a round trip to the Docker daemon. When enabled,
+the node starts this module in the container once and sends its requests to it
+over an unix socket in the shared folder instead::
+
+    python agent.py serve /tmp/agent.sock
+
+Requests and responses are JSON-RPC messages like the OVSDB ones, so the
+stream decoder and the client of :mod:`topology_docker_openswitch.ovsdb` are
+reused on both ends. Like that module, this one is copied to the shared folder
+and must depend only on the standard library.
+"""
+
+from __future__ import unicode_literals, absolute_import
+from __future__ import print_function, division
+
+from collections import OrderedDict
+from json import dumps
+from os import remove
+from os.path import exists
+from select import select
+from socket import AF_UNIX, SOCK_STREAM, socket
+from subprocess import PIPE, Popen
+from sys import argv
+from threading import Lock, Thread, Timer
+
+try:
+    from topology_docker_openswitch.ovsdb import (
+        DB_SOCK, JsonStreamDecoder, OvsdbClient
+    )
+except ImportError:
+    # Inside of the container the module is next to this one
+    from ovsdb import DB_SOCK, JsonStreamDecoder, OvsdbClient
+
+
+class Agent(object):
+    """
+    Server of the agent requests.
+
+    Each connection is served by its own thread, in the order its requests
+    arrive. The methods named ``do_<request>`` implement the requests, their
+    parameters are the ones of the request and their return value its result.
+    An exception raised by them is the error of the response.
+
+    :param str path: Path of the unix socket to listen on.
+    :param str db_sock: Path of the OVSDB unix socket.
+    """
+
+    def __init__(self, path, db_sock=DB_SOCK):
+        self.path = path
+        self.db_sock = db_sock
+        self._ovsdb_client = None
+        self._ovsdb_lock = Lock()
+        self._stopped = False
+
+    def serve_forever(self):
+        """
+        Serve requests until :meth:`shutdown` is called.
+        """
+        if exists(self.path):
+            remove(self.path)
+
+        sock = socket(AF_UNIX, SOCK_STREAM)
+        sock.bind(self.path)
+        sock.listen(8)
+
+        while not self._stopped:
+            readable, _, _ = select([sock], [], [], 0.1)
+            if not readable:
+                continue
+
+            connection, _ = sock.accept()
+            thread = Thread(target=self._serve, args=(connection,))
+            thread.daemon = True
+            thread.start()
+
+        sock.close()
+
+    def shutdown(self):
+        self._stopped = True
+
+    def _serve(self, connection):
+        decoder = JsonStreamDecoder()
+
+        while True:
+            data = connection.recv(65536)
+            if not data:
+                break
+
+            for request in decoder.feed(data):
+                connection.sendall(
+                    dumps(self._handle(request)).encode('utf-8')
+                )
+
+        connection.close()
+
+    def _handle(self, request):
+        response = {'id': request.get('id'), 'result': None, 'error': None}
+        method = getattr(self, 'do_{}'.format(request.get('method')), None)
+
+        if method is None:
+            response['error'] = 'Unknown request {}.'.format(
+                request.get('method')
+            )
+            return response
+
+        try:
+            response['result'] = method(*request.get('params', []))
+        except Exception as error:
+            response['error'] = '{}: {}'.format(
+                error.__class__.__name__, error
+            )
+
+        return response
+
+    def do_run(self, command, timeout=None, input=None):
+        """
+        Run a command.
+
+        :param list command: The command and its arguments.
+        :param float timeout: Seconds after which the command is killed.
+        :param str input: Text written to the standard input of the command.
+        :return: A dictionary with the ``returncode``, ``output`` and
+         ``error_output`` of the command.
+        """
+        process = Popen(command, stdin=PIPE, stdout=PIPE, stderr=PIPE)
+
+        timer = None
+        if timeout is not None:
+            timer = Timer(timeout, process.kill)
+            timer.start()
+
+        output, error_output = process.communicate(
+            None if input is None else input.encode('utf-8')
+        )
+
+        if timer is not None:
+            timer.cancel()
+
+        return {
+            'returncode': process.returncode,
+            'output': output.decode('utf-8', 'replace'),
+            'error_output': error_output.decode('utf-8', 'replace')
+        }
+
+    def do_transact(self, database, timeout, *operations):
+        """
+        Execute OVSDB operations in a single transaction.
+
+        The parameters are the ones of the OVSDB ``transact`` request, with
+        the seconds to wait for its result after the database. The connection
+        with the OVSDB server is opened by the first request and kept for the
+        following ones. It is closed if the transaction fails or times out,
+        so the next request does not get its late result.
+        """
+        with self._ovsdb_lock:
+            if self._ovsdb_client is None:
+                self._ovsdb_client = OvsdbClient.connect_unix(
+                    self.db_sock, timeout=timeout
+                )
+
+            try:
+                return self._ovsdb_client.transact(
+                    database, operations, timeout=timeout
+                )
+            except Exception:
+                self._ovsdb_client.close()
+                self._ovsdb_client = None
+                raise
+
+    def do_set_links(self, links, timeout=None):
+        """
+        Set the state of several links with an ``ip -batch`` per namespace.
+
+        :param list links: The namespace (None for the default one), name
+         and state (True for up) of each link.
+        :param float timeout: Seconds after which each ``ip -batch`` is
+         killed.
+        :return: The number of links set.
+        """
+        batches = OrderedDict()
+
+        for netns, interface, state in links:
+            batches.setdefault(netns, []).append(
+                'link set dev {} {}'.format(
+                    interface, 'up' if state else 'down'
+                )
+            )
+
+        for netns, commands in batches.items():
+            command = ['ip', '-batch', '-']
+            if netns is not None:
+                command = ['ip', 'netns', 'exec', netns] + command
+
+            result = self.do_run(
+                command, timeout=timeout, input='\n'.join(commands) + '\n'
+            )
+
+            if result['returncode']:
+                raise Exception(result['error_output'] or result['output'])
+
+        return len(links)
+
+
+class AgentClient(OvsdbClient):
+    """
+    Client of an :class:`Agent`.
+
+    See :meth:`Agent.do_run`, :meth:`Agent.do_transact` and
+    :meth:`Agent.do_set_links` for the requests and their results. The
+    timeout of each request is passed to the agent too, the client waits a
+    bit longer for the agent to give up.
+    """
+
+    GRACE = 10
+
+    def _grace(self, timeout):
+        return None if timeout is None else timeout + self.GRACE
+
+    def run(self, command, timeout=None, input=None):
+        return self.call(
+            'run', [command, timeout, input], timeout=self._grace(timeout)
+        )
+
+    def transact(self, database, operations, timeout=None):
+        return self.call(
+            'transact', [database, timeout] + list(operations),
+            timeout=self._grace(timeout)
+        )
+
+    def set_links(self, links, timeout=None):
+        return self.call(
+            'set_links', [links, timeout], timeout=self._grace(timeout)
+        )
+
+
+__all__ = ['Agent', 'AgentClient']
+
+
+if __name__ == '__main__':
+    if argv[1:2] == ['serve']:
+        Agent(argv[2]).serve_forever()
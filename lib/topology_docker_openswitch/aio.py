@@ -0,0 +1,246 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2016 Hewlett Packard Enterprise Development LP
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""
+asyncio interface for the shells of the nodes.
+
+The commands are written to the same ``pexpect`` connections used by the
+blocking interface and their output is read without blocking from the event
+loop, so a single thread can drive the shells of many nodes at once. The
+output is matched by the ``pexpect`` expecter, fed by a reader of the event
+loop, so the connections are left as the blocking interface expects them.
+
+The functions of this module return asyncio futures instead of being
+coroutines, so the module can be imported, but not used, without asyncio.
+It needs Python 3.5 or newer.
+"""
+
+from __future__ import unicode_literals, absolute_import
+from __future__ import print_function, division
+
+from pexpect import EOF, TIMEOUT
+from pexpect.expect import Expecter, searcher_re
+from topology.platforms.shell import NonExistingConnectionError, PExpectShell
+
+try:
+    from asyncio import ensure_future, Future, get_event_loop, Lock
+except ImportError:
+    # Python 2.7 has no asyncio
+    ensure_future = Future = get_event_loop = Lock = None
+
+
+def _connect(shell, connection):
+    # The same connection and prompt setup of the blocking interface
+    try:
+        if not shell.is_connected(connection=connection):
+            shell.connect(connection=connection)
+    except NonExistingConnectionError:
+        shell.connect(connection=connection)
+
+
+def _get_lock(shell, connection):
+    # A connection can only be waiting for one command at a time
+    if not hasattr(shell, '_async_locks'):
+        shell._async_locks = {}
+
+    if connection not in shell._async_locks:
+        shell._async_locks[connection] = Lock()
+
+    return shell._async_locks[connection]
+
+
+def _chain(future, source, callback):
+    # Call callback with the result of source, or pass its error to future
+    def done(source):
+        if future.done():
+            return
+
+        try:
+            callback(source.result())
+        except Exception as error:
+            if not future.done():
+                future.set_exception(error)
+
+    source.add_done_callback(done)
+
+
+def _raise(error):
+    raise error
+
+
+def async_expect(spawn, matches, timeout):
+    """
+    Wait without blocking for a connection to match one of several patterns.
+
+    This is the equivalent of ``spawn.expect(matches, timeout=timeout)``, the
+    ``before``, ``after`` and ``match`` attributes of the connection are set
+    the same way.
+
+    :rtype: asyncio.Future
+    :return: A future whose result is the index of the pattern matched.
+    """
+    loop = get_event_loop()
+    future = Future(loop=loop)
+    expecter = Expecter(
+        spawn, searcher_re(spawn.compile_pattern_list(matches))
+    )
+
+    def finish(method, *args):
+        # Like expect, the expecter method gives the index or the error
+        try:
+            index = method(*args)
+        except Exception as error:
+            index = error
+
+        if index is None or future.done():
+            return
+
+        loop.remove_reader(spawn.child_fd)
+        if timer is not None:
+            timer.cancel()
+
+        if isinstance(index, Exception):
+            future.set_exception(index)
+        else:
+            future.set_result(index)
+
+    def read():
+        # The output that follows the match is left to the next expect
+        try:
+            data = spawn.read_nonblocking(spawn.maxread, 0)
+        except EOF as error:
+            finish(expecter.eof, error)
+            return
+        except TIMEOUT:
+            return
+        except Exception as error:
+            finish(_raise, error)
+            return
+
+        finish(expecter.new_data, data)
+
+    timer = None
+    index = expecter.existing_data()
+
+    if index is not None:
+        future.set_result(index)
+        return future
+
+    loop.add_reader(spawn.child_fd, read)
+
+    if timeout is not None:
+        timer = loop.call_later(timeout, finish, expecter.timeout)
+
+    return future
+
+
+def async_send_command(
+    shell, command, matches=None, timeout=None, connection=None,
+    silent=False
+):
+    """
+    Send a command to a shell and get its response without blocking.
+
+    The shell is connected, if it is not already, in the default executor of
+    the event loop, since opening a connection and setting up its prompt is
+    blocking. The command is then sent to the connection with
+    :meth:`PExpectShell.send_command`, which adds the prefix of the shell and
+    logs it, without waiting for any output. Its output is read by the event
+    loop until one of the matches is found.
+
+    If the shell handles ``vtysh`` crashes, the default matches and the
+    checks of the response are the ones of its ``send_command``, see
+    :class:`topology_docker_openswitch.shell.OpenSwitchVtyshShell`.
+
+    :param shell: A ``PExpectShell`` of a node.
+    :param str command: Command to send.
+    :param list matches: Patterns that end the output of the command, the
+     prompt of the shell if None.
+    :param float timeout: Seconds to wait for a match, the timeout of the shell
+     if None.
+    :param str connection: Name of the connection to use.
+    :param bool silent: True to not log the command and its response.
+    :rtype: asyncio.Future
+    :return: A future whose result is the response of the command.
+    """
+    loop = get_event_loop()
+    lock = _get_lock(shell, connection)
+    future = Future(loop=loop)
+
+    if timeout is None:
+        timeout = shell._timeout
+
+    def release(_):
+        lock.release()
+
+    def acquired(acquire):
+        if acquire.cancelled():
+            return
+
+        # The lock is released once the response is set, even if the future
+        # was cancelled while waiting for it
+        future.add_done_callback(release)
+
+        if not future.done():
+            _chain(
+                future,
+                loop.run_in_executor(None, _connect, shell, connection),
+                expect
+            )
+
+    def expect(_):
+        check_response = None
+
+        if matches is not None:
+            expect_matches = matches
+            check_response = getattr(shell, '_handle_crash', None)
+        elif hasattr(shell, '_response_matches'):
+            expect_matches = shell._response_matches()
+        else:
+            expect_matches = [shell._prompt]
+
+        # The output is left in the connection, an immediate timeout is the
+        # only match
+        PExpectShell.send_command(
+            shell, command, matches=[TIMEOUT], timeout=0,
+            connection=connection, silent=silent
+        )
+
+        def respond(match_index):
+            if check_response is not None:
+                check_response(connection)
+            elif hasattr(shell, '_check_response'):
+                shell._check_response(match_index, connection)
+
+            future.set_result(
+                shell.get_response(connection=connection, silent=silent)
+            )
+
+        _chain(
+            future,
+            async_expect(
+                shell._get_connection(connection), expect_matches, timeout
+            ),
+            respond
+        )
+
+    ensure_future(lock.acquire()).add_done_callback(acquired)
+
+    return future
+
+
+__all__ = ['async_expect', 'async_send_command']
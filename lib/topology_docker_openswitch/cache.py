@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2016 Hewlett Packard Enterprise Development LP
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""
+Cache of the capabilities of OpenSwitch images.
+
+Every node of the same image finds the same answers when it probes the image,
+for example if ``vtysh`` supports ``set prompt``, its product name or the
+ports of its hardware description. These answers are cached here by image ID
+so only the first node or connection of each image has to probe it.
+"""
+
+from __future__ import unicode_literals, absolute_import
+from __future__ import print_function, division
+
+from json import dumps, loads
+from os import getpid, makedirs, rename
+from os.path import exists, join
+from threading import Lock
+
+
+class CapabilityCache(object):
+    """
+    Capabilities of OpenSwitch images, keyed by image ID.
+
+    The capabilities are kept in memory and, if ``cache_dir`` is set, in a
+    JSON file per image in that directory too, so they are reused by later
+    sessions.
+
+    :param str cache_dir: Directory where the capabilities are stored, None
+     to keep them in memory only.
+    """
+
+    def __init__(self, cache_dir=None):
+        self.cache_dir = cache_dir
+        self._images = {}
+        self._lock = Lock()
+
+    def _path(self, image_id):
+        return join(
+            self.cache_dir, '{}.json'.format(image_id.replace(':', '_'))
+        )
+
+    def _load(self, image_id):
+        if image_id not in self._images:
+            capabilities = {}
+
+            if self.cache_dir is not None and exists(self._path(image_id)):
+                with open(self._path(image_id), 'r') as fd:
+                    capabilities = loads(fd.read())
+
+            self._images[image_id] = capabilities
+
+        return self._images[image_id]
+
+    def get(self, image_id, capability, default=None):
+        """
+        Get a capability of an image.
+
+        :param str image_id: ID of the image, if None nothing is cached.
+        :param str capability: Name of the capability.
+        :return: The cached value, or default if it is not cached.
+        """
+        if image_id is None:
+            return default
+
+        with self._lock:
+            return self._load(image_id).get(capability, default)
+
+    def set(self, image_id, capability, value):
+        """
+        Cache a capability of an image.
+
+        :param str image_id: ID of the image, if None nothing is cached.
+        :param str capability: Name of the capability.
+        :param value: Value of the capability, it must be JSON serializable.
+        """
+        if image_id is None:
+            return
+
+        with self._lock:
+            capabilities = self._load(image_id)
+            capabilities[capability] = value
+
+            if self.cache_dir is None:
+                return
+
+            if not exists(self.cache_dir):
+                makedirs(self.cache_dir)
+
+            # Written in a temporary file first so other processes sharing the
+            # cache directory never read an incomplete file.
+            temporary = '{}.{}.tmp'.format(self._path(image_id), getpid())
+            with open(temporary, 'w') as fd:
+                fd.write(dumps(capabilities))
+            rename(temporary, self._path(image_id))
+
+
+# Cache shared by all the nodes, its directory is set with the
+# --topology-openswitch-cache-dir option of the pytest plugin.
+CAPABILITIES = CapabilityCache()
+
+
+__all__ = ['CapabilityCache', 'CAPABILITIES']
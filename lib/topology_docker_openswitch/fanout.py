@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2016 Hewlett Packard Enterprise Development LP
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""
+Send the same commands to several nodes at the same time.
+"""
+
+from __future__ import unicode_literals, absolute_import
+from __future__ import print_function, division
+
+from six import string_types
+
+from .parallel import TaskPool
+
+
+def openswitch_nodes(topology, identifiers=None):
+    """
+    Get the OpenSwitch nodes of a topology.
+
+    :param topology: A built topology.
+    :param list identifiers: Identifiers of the nodes to get, all of them if
+     None.
+    :rtype: list
+    :return: The node objects, in the order of the topology.
+    """
+    nodes = []
+
+    for identifier in topology.nodes:
+        if identifiers is not None and identifier not in identifiers:
+            continue
+
+        node = topology.get(identifier)
+
+        if node.metadata.get('type', None) == 'openswitch':
+            nodes.append(node)
+
+    return nodes
+
+
+def _send(node, commands, shell):
+    if isinstance(commands, string_types):
+        return node.send_command(commands, shell=shell)
+
+    shell_object = node.get_shell(shell)
+
+    # The vtysh shell can send all the commands at once, a crash stops it at
+    # the command that crashed
+    if hasattr(shell_object, 'send_commands'):
+        return shell_object.send_commands(commands)
+
+    return [node.send_command(command, shell=shell) for command in commands]
+
+
+def fan_out(nodes, commands, shell='vtysh', workers=8, timeout=None):
+    """
+    Send commands to several nodes at the same time.
+
+    Every node gets its own thread, up to workers of them at the same time,
+    that sends it the commands one after the other. A list of commands for a
+    ``vtysh`` shell is sent with
+    :meth:`topology_docker_openswitch.shell.OpenSwitchVtyshShell.send_commands`.
+
+    If ``vtysh`` crashes in a node, the commands that follow the one that
+    crashed are not run in that node and its error is the crash. The rest of
+    the nodes are not affected.
+
+    :param list nodes: The node objects.
+    :param commands: A command, or a list of commands.
+    :param str shell: Name of the shell the commands are sent to.
+    :param int workers: Maximum number of nodes receiving commands at the same
+     time.
+    :param float timeout: Seconds given to each node to answer all the
+     commands, None to wait forever. A node that does not answer in time is
+     abandoned and its shell may be left waiting for the response. It keeps
+     its worker until it answers.
+    :rtype: OrderedDict
+    :return: A :class:`topology_docker_openswitch.parallel.TaskResult` for
+     each node identifier, whose value is the response of the command, or the
+     list of responses of the commands.
+    """
+    pool = TaskPool(workers, timeout=timeout)
+
+    for node in nodes:
+        pool.submit(node.identifier, _send, node, commands, shell)
+
+    return pool.join()
+
+
+__all__ = ['openswitch_nodes', 'fan_out']
@@ -25,27 +25,49 @@ from __future__ import unicode_literals, absolute_import
 from __future__ import print_function, division
 
 from abc import ABCMeta, abstractmethod
-from json import loads
-from subprocess import check_output, CalledProcessError
+from json import loads, dumps
+from collections import OrderedDict
+from subprocess import (
+    check_call, check_output, CalledProcessError, Popen, PIPE
+)
+from shlex import split as shsplit
+from time import sleep
 from platform import system, linux_distribution
 from logging import StreamHandler, getLogger, INFO, Formatter
 from sys import stdout
-from os.path import join, dirname, normpath, abspath
+from socket import timeout as socket_timeout
+from os.path import join, dirname, normpath, abspath, exists
+from threading import Lock
+from base64 import b64encode
 
 from six import add_metaclass
+from six.moves import shlex_quote
 
 from topology_openswitch.openswitch import OpenSwitchBase
 
 from topology_docker.node import DockerNode
-from topology_docker.shell import DockerBashShell
 
-from .shell import OpenSwitchVtyshShell
+from .shell import OpenSwitchBashShell, OpenSwitchVtyshShell
+from .ovsdb import (
+    DB_SOCK, OvsdbBatch, OvsdbClient, OvsdbConnectionError, OvsdbError,
+    OvsdbTimeout, PipeTransport
+)
+from .agent import AgentClient
+from .parallel import TaskPool
+from .cache import CAPABILITIES
+from .pool import SessionPool
 
 # When a failure happens during boot time, logs and other information is
 # collected to help with the debugging. The path of this collection is to be
 # stored here at module level to be able to import it in the pytest teardown
-# hook later. Non-failing containers will append their log paths here also.
+# hook later. Non-failing containers will append their log paths here also,
+# unless LOG_HEALTHY_NODES is disabled by the pytest plugin to collect only the
+# artifacts of failures.
 LOG_PATHS = []
+LOG_HEALTHY_NODES = True
+# The boot profile of every node set up is stored here for the pytest plugin to
+# summarize them at the end of the session.
+BOOT_PROFILES = []
 LOG = getLogger(__name__)
 LOG_HDLR = StreamHandler(stream=stdout)
 LOG_HDLR.setFormatter(Formatter('%(asctime)s %(message)s'))
@@ -53,42 +75,139 @@ LOG_HDLR.setLevel(INFO)
 LOG.addHandler(LOG_HDLR)
 LOG.setLevel(INFO)
 
+# Maximum number of nodes whose setup script runs at the same time. If it is 0
+# every node is set up during its notify_post_build call, one after the other.
+# Otherwise the setup is started in the background and join_bringup must be
+# called before using the nodes, the pytest plugin does it after building the
+# topology. It is set with the --topology-openswitch-bringup-workers option.
+BRINGUP_WORKERS = 0
+BRINGUP_POOL = None
+
+# If True, the journal of the container and the debug log of the setup script
+# are written to the shared folder while the script runs, so the evidence of a
+# failed boot is already there and only the state of the container has to be
+# dumped afterwards. It is set with the --topology-openswitch-stream-journal
+# option.
+STREAM_BOOT_JOURNAL = False
+
+# Names of the shells whose connections are opened in the background once the
+# node is set up, so the first command sent to them does not wait for them to
+# connect. It is set with the --topology-openswitch-prewarm-shells option.
+PREWARM_SHELLS = []
+
+# If True, an agent is started in the container of every node once it is set
+# up and the node sends its commands, OVSDB transactions and port changes to it
+# instead of running a docker exec for each one of them. It is set with the
+# --topology-openswitch-agent option.
+USE_AGENT = False
+
+# Seconds to wait for the agent to answer a request that has no timeout of its
+# own. If it does not answer in time, it is not used anymore.
+AGENT_TIMEOUT = 300
+
+# Number of vtysh sessions of the pool of each node, see vtysh_pool. It is set
+# with the --topology-openswitch-vtysh-pool-size option.
+VTYSH_POOL_SIZE = 2
+
+
+class BringUpError(Exception):
+    """
+    Raised by :func:`join_bringup` when the setup of some nodes failed.
+
+    :var dict failures: Maps the identifier of each failed node to a tuple
+     with the exception raised by its setup and the path of its logs.
+    """
+
+    def __init__(self, failures):
+        self.failures = failures
+        super(BringUpError, self).__init__(
+            'The setup of {} OpenSwitch nodes failed:\n{}'.format(
+                len(failures),
+                '\n'.join(
+                    '{}: {} (logs in {})'.format(identifier, error, log_path)
+                    for identifier, (error, log_path) in failures.items()
+                )
+            )
+        )
+
+
+def join_bringup():
+    """
+    Wait for the nodes being set up in the background to finish.
+
+    :raises BringUpError: If the setup of any of the nodes failed.
+    """
+    if BRINGUP_POOL is None:
+        return
+
+    failures = OrderedDict(
+        (node.identifier, (result.error, node.shared_dir))
+        for node, result in BRINGUP_POOL.join().items()
+        if result.error is not None
+    )
+
+    if failures:
+        raise BringUpError(failures)
+
 
 def log_commands(
-    commands, location, function, escape=True,
-    prefix=None, suffix=None, **kwargs
+    commands, location, function, escape=True, prefix=None, suffix=None,
+    timeout=60, **kwargs
 ):
+    """
+    Log the output of several commands in a file with a single call.
+
+    The commands are rendered in a shell script that appends to location a
+    header, the output and the exit code of each one of them. Each command is
+    killed after timeout seconds so a hung one does not block the rest. The
+    script is passed encoded in base64 so it needs no escaping, and run with
+    ``function(prefix + 'echo <script> | base64 -d | sh' + suffix, **kwargs)``.
+
+    :param list commands: Commands to log.
+    :param str location: Path of the file where the output is appended.
+    :param function: Function that runs a command, like ``check_output`` or
+     :meth:`DockerNode._docker_exec`.
+    :param bool escape: Deprecated and ignored, the script needs no escaping.
+    :param str prefix: Prefix of the command run.
+    :param str suffix: Suffix of the command run.
+    :param int timeout: Seconds each command may run.
+    """
     if prefix is None:
         prefix = ''
     if suffix is None:
         suffix = ''
 
+    lines = []
+
     for command in commands:
-        log_path = ' >> {} 2>&1'.format(location)
-        args = [
-            r'{prefix}echo \"Output of:'
-            r' {command}{log_path}\"{log_path}{suffix}'.format(
-                prefix=prefix, command=command,
-                log_path=log_path, suffix=suffix
+        lines.extend([
+            'echo {}'.format(shlex_quote('Output of: {}'.format(command))),
+            'timeout {} sh -c {} < /dev/null'.format(
+                timeout, shlex_quote(command)
             ),
-            r'{}{}{}{}'.format(
-                prefix, command, log_path, suffix
+            'echo "Exit code: $?"',
+            'echo ""'
+        ])
+
+    script = '{{\n{}\n}} >> {} 2>&1\n'.format(
+        '\n'.join(lines), shlex_quote(location)
+    )
+
+    try:
+        function(
+            '{}echo {} | base64 -d | sh{}'.format(
+                prefix,
+                b64encode(script.encode('utf-8')).decode('ascii'),
+                suffix
             ),
-            r'{}echo \"\"{}{}'.format(prefix, log_path, suffix)
-        ]
-
-        for arg in args:
-            try:
-                if not escape:
-                    arg = arg.replace('\\', '')
-                function(arg, **kwargs)
-
-            except CalledProcessError as error:
-                LOG.warning(
-                    '{} failed with error {}.'.format(
-                        command, error.returncode
-                    )
-                )
+            **kwargs
+        )
+    except CalledProcessError as error:
+        LOG.warning(
+            'Logging commands in {} failed with error {}.'.format(
+                location, error.returncode
+            )
+        )
 
 
 @add_metaclass(ABCMeta)
@@ -127,34 +246,66 @@ class DockerOpenSwitch(OpenSwitchBase, DockerNode):
         # FIXME: Remove this attribute to merge with version > 1.6.0
         self._shared_dir_mount = '/tmp'
 
+        # Capabilities probed in the image are cached by its identifier
+        self._image_id = self._client.inspect_container(
+            self.container_id
+        )['Image']
+
+        # Port mapping written by the setup script and namespace of the mapped
+        # ports, kept at setup since the shared folder is removed with the
+        # artifacts of each test, see refresh_ports
+        self._port_mapping = {}
+        self._mapped_ports_netns = 'swns'
+
+        # Namespace of each port, see refresh_ports
+        self._ports_netns = {}
+
+        # Seconds since the start of the setup script at which each one of its
+        # boot phases finished, see _read_boot_profile
+        self.boot_profile = OrderedDict()
+
+        # Persistent OVSDB connection, created when first needed
+        self._ovsdb_client = None
+        self._ovsdb_lock = Lock()
+
+        # Connection with the agent of the container, see _start_agent
+        self._agent = None
+        self._agent_lock = Lock()
+
+        # Pool of vtysh sessions, created when first needed
+        self._vtysh_pool = None
+        self._vtysh_pool_lock = Lock()
+
         # Add vtysh (default) shell
         # This shell is started as a bash shell but it changes itself to a
         # vtysh one afterwards. This is necessary because this shell must be
         # started from a bash one that has echo disabled to avoid wrong
         # matching with some command output and by setting an unique prompt
         # with the set prompt vtysh command
-        self._register_shell('vtysh', OpenSwitchVtyshShell(self.container_id))
+        self._register_shell(
+            'vtysh', OpenSwitchVtyshShell(self.container_id, self._image_id)
+        )
 
         # Add bash shells
 
         initial_prompt = '(^|\n).*[#$] '
         self._register_shell(
             'bash',
-            DockerBashShell(
+            OpenSwitchBashShell(
                 self.container_id, 'bash',
                 initial_prompt=initial_prompt
             )
         )
         self._register_shell(
             'bash_swns',
-            DockerBashShell(
+            OpenSwitchBashShell(
                 self.container_id, 'ip netns exec swns bash',
                 initial_prompt=initial_prompt
             )
         )
         self._register_shell(
             'vsctl',
-            DockerBashShell(
+            OpenSwitchBashShell(
                 self.container_id, 'bash',
                 initial_prompt=initial_prompt,
                 prefix='ovs-vsctl ', timeout=60
@@ -166,13 +317,25 @@ class DockerOpenSwitch(OpenSwitchBase, DockerNode):
         Get notified that the post build stage of the topology build was
         reached.
 
+        If ``BRINGUP_WORKERS`` is set, the setup of the node is only started
+        here and :func:`join_bringup` waits for it to finish.
+
         :param script_path:
           string with the path of the setup script to be used
 
         See :meth:`DockerNode.notify_post_build` for more information.
         """
         super(DockerOpenSwitch, self).notify_post_build()
-        self._setup_system(script_path)
+
+        if not BRINGUP_WORKERS:
+            self._setup_system(script_path)
+            return
+
+        global BRINGUP_POOL
+        if BRINGUP_POOL is None:
+            BRINGUP_POOL = TaskPool(BRINGUP_WORKERS)
+
+        BRINGUP_POOL.submit(self, self._setup_system, script_path)
 
     def _setup_system(self, script_path=None):
         """
@@ -197,13 +360,52 @@ class DockerOpenSwitch(OpenSwitchBase, DockerNode):
         with open(setup_script, 'w') as fd:
             fd.write(openswitch_setup)
 
-        try:
-            self._docker_exec(
-                'python {}/openswitch_setup.py -d'.format(
-                    self.shared_dir_mount
-                )
+        # The setup script uses the OVSDB client module
+        ovsdb_path = join(dirname(normpath(abspath(__file__))), 'ovsdb.py')
+
+        with open(ovsdb_path) as ovsdb_file:
+            ovsdb = ovsdb_file.read()
+
+        with open('{}/ovsdb.py'.format(self.shared_dir), 'w') as fd:
+            fd.write(ovsdb)
+
+        if USE_AGENT:
+            agent_path = join(dirname(normpath(abspath(__file__))), 'agent.py')
+
+            with open(agent_path) as agent_file:
+                agent = agent_file.read()
+
+            with open('{}/agent.py'.format(self.shared_dir), 'w') as fd:
+                fd.write(agent)
+
+        # The setup script reads the hardware ports from hwports.json instead
+        # of parsing the hardware description if they are already known.
+        hwports_path = '{}/hwports.json'.format(self.shared_dir)
+        hwports = CAPABILITIES.get(self._image_id, 'hwports')
+
+        if hwports is not None:
+            with open(hwports_path, 'w') as fd:
+                fd.write(dumps(hwports))
+
+        setup_command = 'python {}/openswitch_setup.py -d'.format(
+            self.shared_dir_mount
+        )
+        journal = None
+
+        if STREAM_BOOT_JOURNAL:
+            setup_command = '{} -l {}/setup_debug_log'.format(
+                setup_command, self.shared_dir_mount
+            )
+            journal = self._stream_journal(
+                '{}/boot_journal'.format(self.shared_dir)
             )
+
+        try:
+            self._docker_exec(setup_command)
         except Exception as e:
+            if journal is not None:
+                self._stop_journal(journal)
+
             global FAIL_LOG_PATH
             lines_to_dump = 100
 
@@ -258,6 +460,16 @@ class DockerOpenSwitch(OpenSwitchBase, DockerNode):
                 'cat /var/log/messages'
             ]
 
+            if journal is not None:
+                # The journal already has the messages and the service logs
+                container_commands = [
+                    'ovs-vsctl list Daemon',
+                    'coredumpctl gdb',
+                    'ps -aef',
+                    'systemctl --state=failed --all',
+                    'ovsdb-client dump'
+                ]
+
             execution_machine_commands = [
                 'tail -n 2000 /var/log/syslog',
                 'docker ps -a',
@@ -267,7 +479,7 @@ class DockerOpenSwitch(OpenSwitchBase, DockerNode):
             log_commands(
                 container_commands,
                 '{}/container_logs'.format(self.shared_dir_mount),
-                self._docker_exec,
+                self._exec,
                 prefix=r'sh -c "',
                 suffix=r'"'
             )
@@ -275,34 +487,434 @@ class DockerOpenSwitch(OpenSwitchBase, DockerNode):
                 execution_machine_commands,
                 '{}/execution_machine_logs'.format(self.shared_dir),
                 check_output,
-                escape=False,
                 shell=True
             )
             LOG_PATHS.append(self.shared_dir)
+            self._read_boot_profile(self._read_setup_result())
 
             raise e
 
-        # Add virtual type
+        if journal is not None:
+            self._stop_journal(journal)
 
-        vtysh = self.get_shell('vtysh')
+        setup_result = self._read_setup_result()
+        self._read_boot_profile(setup_result)
 
-        vtysh.send_command('show version', silent=True)
-        if 'genericx86-64' in vtysh.get_response(silent=True):
-            self.product_name = 'genericx86-64'
-        else:
-            self.product_name = 'genericx86-p4'
+        if exists(hwports_path):
+            with open(hwports_path, 'r') as fd:
+                CAPABILITIES.set(self._image_id, 'hwports', loads(fd.read()))
+
+        # Add virtual type, the setup script detects it while creating the
+        # interfaces. Custom setup scripts may not, then it is asked to vtysh.
+        self.product_name = setup_result.get('product_name')
+
+        if self.product_name is None:
+            self.product_name = CAPABILITIES.get(
+                self._image_id, 'product_name'
+            )
+
+        if self.product_name is None:
+            vtysh = self.get_shell('vtysh')
+
+            vtysh.send_command('show version', silent=True)
+            if 'genericx86-64' in vtysh.get_response(silent=True):
+                self.product_name = 'genericx86-64'
+            else:
+                self.product_name = 'genericx86-p4'
+
+            CAPABILITIES.set(
+                self._image_id, 'product_name', self.product_name
+            )
+
+        if LOG_HEALTHY_NODES:
+            LOG_PATHS.append(self.shared_dir)
+
+        # Read back port mapping, custom setup scripts may only write it in
+        # its own file
+        self._port_mapping = setup_result.get('port_mapping')
+
+        if self._port_mapping is None:
+            port_mapping = '{}/port_mapping.json'.format(self.shared_dir)
+            with open(port_mapping, 'r') as fd:
+                self._port_mapping = loads(fd.read())
+
+        self._mapped_ports_netns = setup_result.get('netns', 'swns')
+        self.refresh_ports()
+
+        if USE_AGENT:
+            self._start_agent()
+
+        for shell in PREWARM_SHELLS:
+            if shell not in self.available_shells():
+                LOG.warning(
+                    'Unable to pre-warm unknown shell {} of {}.'.format(
+                        shell, self.identifier
+                    )
+                )
+                continue
 
-        # Read back port mapping
-        port_mapping = '{}/port_mapping.json'.format(self.shared_dir)
-        with open(port_mapping, 'r') as fd:
-            mappings = loads(fd.read())
+            self.get_shell(shell).prewarm()
 
-        LOG_PATHS.append(self.shared_dir)
+    def _read_setup_result(self):
+        """
+        Read the result written by the setup script.
+
+        The result has the product name, the namespace of the ports, the port
+        mapping and the boot profile found by the script. Custom setup scripts
+        may not write it, then an empty one is returned.
+
+        :rtype: dict
+        """
+        setup_result = '{}/setup_result.json'.format(self.shared_dir)
+
+        if not exists(setup_result):
+            return {}
+
+        with open(setup_result, 'r') as fd:
+            return loads(fd.read())
+
+    def refresh_ports(self, reread=False):
+        """
+        Resolve the namespace of each port of the node again.
+
+        The ports renamed and moved to a namespace (``swns``, or ``emulns`` in
+        P4 images) by the setup script are found in its port mapping, the
+        rest of the ports remain in the default namespace of the container.
+        The namespace of each port is resolved here, so setting the state of
+        a port does not need to look for it in the container. This is done at
+        the end of the setup of the node with the mapping and namespace kept
+        from the result of the setup script, and only needs to be done again
+        if the ports are changed afterwards.
+
+        :param bool reread: Read the result of the setup script again from
+         the container, with a single command, instead of using the one kept
+         at setup.
+        """
+        if reread:
+            # The port mapping is wrapped as a setup result if the setup
+            # script did not write one
+            setup_result = loads(self._exec(
+                'sh -c "cat {0}/setup_result.json 2> /dev/null || '
+                '{{ echo \'{{\\"port_mapping\\": \'; '
+                'cat {0}/port_mapping.json; echo \'}}\'; }}"'.format(
+                    self.shared_dir_mount
+                )
+            ))
+            self._port_mapping = setup_result['port_mapping']
+            self._mapped_ports_netns = setup_result.get('netns', 'swns')
 
         if hasattr(self, 'ports'):
-            self.ports.update(mappings)
+            self.ports.update(self._port_mapping)
+        else:
+            self.ports = dict(self._port_mapping)
+
+        self._ports_netns = {
+            portlbl: (
+                self._mapped_ports_netns
+                if portlbl in self._port_mapping else None
+            )
+            for portlbl in self.ports
+        }
+
+    def _stream_journal(self, path):
+        """
+        Start writing the journal of the container to path in the background.
+
+        The journal is read from its beginning and followed by a ``docker
+        exec`` whose output is written directly to path.
+
+        :return: The process and file of the stream, to be passed to
+         :meth:`_stop_journal`, or None if it could not be started.
+        """
+        journal_file = open(path, 'wb')
+
+        try:
+            process = Popen(
+                [
+                    'docker', 'exec', self.container_id,
+                    'journalctl', '--follow', '--lines=all', '--no-pager',
+                    '--output=short-precise'
+                ],
+                stdout=journal_file, stderr=journal_file
+            )
+        except OSError as error:
+            journal_file.close()
+            LOG.warning(
+                'Unable to stream the journal of {}: {}'.format(
+                    self.identifier, error
+                )
+            )
+            return None
+
+        return process, journal_file
+
+    def _stop_journal(self, journal):
+        """
+        Stop a journal stream started with :meth:`_stream_journal`.
+        """
+        process, journal_file = journal
+
+        if process.poll() is None:
+            process.terminate()
+        process.wait()
+        journal_file.close()
+
+    def _read_boot_profile(self, setup_result):
+        """
+        Read the boot profile from the result of the setup script.
+
+        The profile has the phases of the boot that were reached, in order,
+        with the seconds since the start of the script at which each one of
+        them finished. Custom setup scripts may not write it.
+        """
+        if 'boot_profile' not in setup_result:
             return
-        self.ports = mappings
+
+        self.boot_profile = OrderedDict(setup_result['boot_profile'])
+
+        BOOT_PROFILES.append(self.boot_profile)
+
+    def _start_agent(self, timeout=5):
+        """
+        Start the agent in the container and connect to it.
+
+        The agent listens on ``agent.sock`` in the shared folder. If it can not
+        be reached after timeout seconds the node keeps using ``docker exec``.
+        """
+        socket_path = '{}/agent.sock'.format(self.shared_dir)
+
+        try:
+            check_call([
+                'docker', 'exec', '-d', self.container_id, 'python',
+                '{}/agent.py'.format(self.shared_dir_mount), 'serve',
+                '{}/agent.sock'.format(self.shared_dir_mount)
+            ])
+
+            for _ in range(int(timeout * 10)):
+                if exists(socket_path):
+                    break
+                sleep(0.1)
+
+            self._agent = AgentClient.connect_unix(
+                socket_path, timeout=AGENT_TIMEOUT
+            )
+
+        except Exception as error:
+            LOG.warning(
+                'Unable to start the agent of {}, using docker exec: '
+                '{}'.format(self.identifier, error)
+            )
+
+    def _call_agent(self, method, *args, **kwargs):
+        """
+        Send a request to the agent.
+
+        The request is given the timeout of the caller, or
+        :data:`AGENT_TIMEOUT` seconds if it has none, so the agent lock is
+        not held forever. If the connection with the agent fails, it is not
+        used anymore and None is returned so the caller falls back to
+        ``docker exec``. Errors answered by the agent and timeouts are raised
+        as :class:`topology_docker_openswitch.ovsdb.OvsdbError`, since the
+        request may have been executed and must not be executed again. An
+        agent that times out is not used anymore either.
+
+        :return: The result of the request, or None if there is no agent.
+        """
+        if kwargs.get('timeout') is None:
+            kwargs['timeout'] = AGENT_TIMEOUT
+
+        with self._agent_lock:
+            if self._agent is None:
+                return None
+
+            try:
+                return getattr(self._agent, method)(*args, **kwargs)
+            except (OvsdbTimeout, socket_timeout) as error:
+                LOG.warning(
+                    'The agent of {} timed out, using docker exec: {}'.format(
+                        self.identifier, error
+                    )
+                )
+                self._agent.close()
+                self._agent = None
+
+                raise OvsdbTimeout(str(error))
+            except (OvsdbConnectionError, IOError, OSError) as error:
+                LOG.warning(
+                    'The agent of {} failed, using docker exec: {}'.format(
+                        self.identifier, error
+                    )
+                )
+                self._agent.close()
+                self._agent = None
+
+        return None
+
+    def _exec(self, command, timeout=None):
+        """
+        Execute a command inside the container.
+
+        The command is run by the agent if it is running, with
+        :meth:`DockerNode._docker_exec` otherwise.
+
+        :param str command: The command to execute.
+        :param float timeout: Seconds after which the agent kills the
+         command, :data:`AGENT_TIMEOUT` if None.
+        :rtype: str
+        :return: The standard output of the command.
+        """
+        try:
+            result = self._call_agent('run', shsplit(command), timeout=timeout)
+        except OvsdbError as error:
+            # The agent could not run the command or did not answer in time
+            raise CalledProcessError(127, command, str(error))
+
+        if result is None:
+            return self._docker_exec(command)
+
+        if result['returncode']:
+            raise CalledProcessError(
+                result['returncode'], command, result['output']
+            )
+
+        return result['output']
+
+    def _get_ovsdb_client(self):
+        """
+        Get the persistent OVSDB client of this node.
+
+        The client talks to the OVSDB socket of the container through a relay
+        process started with ``docker exec -i``, so all the requests of the
+        node share a single connection. The source of the relay is passed in
+        its command line, since the shared folder is removed with the
+        artifacts of each test.
+        """
+        if self._ovsdb_client is None:
+            ovsdb_path = join(dirname(normpath(abspath(__file__))), 'ovsdb.py')
+
+            with open(ovsdb_path) as ovsdb_file:
+                ovsdb = ovsdb_file.read()
+
+            relay = Popen(
+                [
+                    'docker', 'exec', '-i', self.container_id, 'python',
+                    '-c', ovsdb, 'relay', DB_SOCK
+                ],
+                stdin=PIPE, stdout=PIPE
+            )
+            self._ovsdb_client = OvsdbClient(PipeTransport(relay))
+
+        return self._ovsdb_client
+
+    def ovsdb_transact(self, operations, database='OpenSwitch', timeout=60):
+        """
+        Execute OVSDB operations in the database of this node.
+
+        :param list operations: OVSDB operations, as defined in RFC 7047, to be
+         executed in a single transaction.
+        :param str database: Name of the database.
+        :param float timeout: Seconds to wait for the result.
+        :rtype: list
+        :return: The result of each one of the operations.
+        """
+        result = self._call_agent(
+            'transact', database, operations, timeout=timeout
+        )
+
+        if result is not None:
+            return result
+
+        with self._ovsdb_lock:
+            try:
+                return self._get_ovsdb_client().transact(
+                    database, operations, timeout=timeout
+                )
+            except (OvsdbError, IOError, OSError):
+                # The relay may be dead or still have to answer this request,
+                # so the next transaction starts a new one.
+                client, self._ovsdb_client = self._ovsdb_client, None
+
+                if client is not None:
+                    try:
+                        client.close()
+                    except (IOError, OSError):
+                        pass
+
+                raise
+
+    def vtysh_pool(self):
+        """
+        Get the pool of ``vtysh`` sessions of this node.
+
+        The first call registers ``VTYSH_POOL_SIZE`` ``vtysh`` shells, named
+        ``vtysh_pool_0``, ``vtysh_pool_1`` and so on, each one with its own
+        session, set up like the one of the ``vtysh`` shell. Several threads
+        can use the pool at the same time without sharing a session, see
+        :class:`topology_docker_openswitch.pool.SessionPool`.
+
+        :rtype: SessionPool
+        """
+        with self._vtysh_pool_lock:
+            if self._vtysh_pool is None:
+                shells = []
+
+                for index in range(VTYSH_POOL_SIZE):
+                    shell = OpenSwitchVtyshShell(
+                        self.container_id, self._image_id
+                    )
+                    self._register_shell(
+                        'vtysh_pool_{}'.format(index), shell
+                    )
+                    shells.append(shell)
+
+                self._vtysh_pool = SessionPool(shells)
+
+        return self._vtysh_pool
+
+    def async_send_command(
+        self, command, shell=None, matches=None, timeout=None,
+        connection=None, silent=False
+    ):
+        """
+        Send a command to a shell of this node without blocking.
+
+        This returns a future to be awaited in an asyncio event loop, the
+        result of which is the response of the command::
+
+            response = await ops1.async_send_command('show version')
+
+        See :func:`topology_docker_openswitch.aio.async_send_command`, it
+        needs Python 3.5 or newer.
+
+        :param str shell: Name of the shell, the default one if None.
+        """
+        from .aio import async_send_command
+
+        if shell is None:
+            shell = self._default_shell or list(self._shells.keys())[0]
+
+        return async_send_command(
+            self.get_shell(shell), command, matches=matches,
+            timeout=timeout, connection=connection, silent=silent
+        )
+
+    def ovsdb_batch(self, database='OpenSwitch', timeout=60):
+        """
+        Create a batch of OVSDB operations for the database of this node.
+
+        The operations queued in the batch are committed as a single
+        transaction over the persistent OVSDB connection of the node, see
+        :class:`topology_docker_openswitch.ovsdb.OvsdbBatch`.
+
+        :param str database: Name of the database.
+        :param float timeout: Seconds to wait for the result of each commit.
+        :rtype: OvsdbBatch
+        """
+        return OvsdbBatch(
+            lambda operations: self.ovsdb_transact(
+                operations, database=database, timeout=timeout
+            )
+        )
 
     def set_port_state(self, portlbl, state):
         """
@@ -310,18 +922,57 @@ class DockerOpenSwitch(OpenSwitchBase, DockerNode):
 
         See :meth:`DockerNode.set_port_state` for more information.
         """
-        iface = self.ports[portlbl]
-        state = 'up' if state else 'down'
+        self.set_ports_state({portlbl: state})
+
+    def set_ports_state(self, states):
+        """
+        Set several port labels to the given states at once.
+
+        All the changes are applied with a single ``docker exec``, or a single
+        request to the agent, that runs an ``ip -batch`` for each namespace the
+        ports are in.
+
+        :param dict states: Maps each port label to its state, True for up
+         and False for down.
+        """
+        if not states:
+            return
 
-        not_in_netns = self._docker_exec('ls /sys/class/net/').split()
-        prefix = '' if iface in not_in_netns else 'ip netns exec swns'
+        links = [
+            [self._ports_netns.get(portlbl), self.ports[portlbl], state]
+            for portlbl, state in states.items()
+        ]
+
+        try:
+            if self._call_agent('set_links', links) is not None:
+                return
+        except OvsdbError as error:
+            raise CalledProcessError(1, 'ip -batch -', str(error))
 
-        command = '{prefix} ip link set dev {iface} {state}'.format(**locals())
-        self._docker_exec(command)
+        batches = OrderedDict()
+
+        for portlbl, state in states.items():
+            batches.setdefault(
+                self._ports_netns.get(portlbl), []
+            ).append(
+                'link set dev {} {}'.format(
+                    self.ports[portlbl], 'up' if state else 'down'
+                )
+            )
+
+        script = ' && '.join(
+            'printf \'{}\\n\' | {}ip -batch -'.format(
+                '\\n'.join(commands),
+                '' if netns is None else 'ip netns exec {} '.format(netns)
+            )
+            for netns, commands in batches.items()
+        )
+
+        self._docker_exec('sh -c "{}"'.format(script))
 
     def stop(self):
         """
-        Exit all vtysh shells.
+        Exit all vtysh shells and close the OVSDB and agent connections.
 
         See :meth:`DockerNode.stop` for more information.
         """
@@ -330,6 +981,14 @@ class DockerOpenSwitch(OpenSwitchBase, DockerNode):
             if isinstance(shell, OpenSwitchVtyshShell):
                 shell._exit()
 
+        if self._ovsdb_client is not None:
+            self._ovsdb_client.close()
+            self._ovsdb_client = None
+
+        if self._agent is not None:
+            self._agent.close()
+            self._agent = None
+
         super(DockerOpenSwitch, self).stop()
 
 
@@ -342,4 +1001,4 @@ class OpenSwitch(DockerOpenSwitch):
         super(OpenSwitch, self).__init__(*args, **kwargs)
 
 
-__all__ = ['DockerOpenSwitch', 'OpenSwitch']
+__all__ = ['BringUpError', 'join_bringup', 'DockerOpenSwitch', 'OpenSwitch']
@@ -0,0 +1,583 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2016 Hewlett Packard Enterprise Development LP
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""
+Small OVSDB JSON-RPC client.
+
+This module is used both by the node in the host and by the setup script
+inside of the container, where it is copied next to ``openswitch_setup.py``.
+For that reason it must depend only on the standard library and run with any
+of the Python versions that may be found in an OpenSwitch image.
+
+When executed as a script it relays its standard input and output to the OVSDB
+unix socket, this allows the host to keep a persistent connection with the
+database of a container through a single ``docker exec -i``::
+
+    python ovsdb.py relay /var/run/openvswitch/db.sock
+"""
+
+from __future__ import unicode_literals, absolute_import
+from __future__ import print_function, division
+
+from codecs import getincrementaldecoder
+from collections import deque
+from json import dumps, JSONDecoder
+from os import read, write
+from re import compile as regex
+from select import select
+from socket import AF_UNIX, SOCK_STREAM, socket
+from sys import argv, stdin, stdout
+from time import time
+
+
+DB_SOCK = '/var/run/openvswitch/db.sock'
+
+UUID = regex(r'^[0-9a-f]{8}(-[0-9a-f]{4}){3}-[0-9a-f]{12}$')
+
+
+class OvsdbError(Exception):
+    """
+    Raised when the OVSDB server answers a request with an error.
+    """
+
+
+class OvsdbTimeout(OvsdbError):
+    """
+    Raised when the answer to a request does not arrive in time.
+    """
+
+
+class OvsdbConnectionError(OvsdbError):
+    """
+    Raised when the connection with the server is closed.
+    """
+
+
+class JsonStreamDecoder(object):
+    """
+    Incremental decoder for a stream of concatenated JSON values.
+
+    OVSDB does not frame its messages, every message is a JSON object that
+    follows the previous one in the stream. Data is fed as it is read from
+    the connection and complete messages are returned as soon as they are
+    available, the incomplete tail is kept until the rest of it arrives.
+    """
+
+    def __init__(self):
+        self._text = getincrementaldecoder('utf-8')()
+        self._decoder = JSONDecoder()
+        self._buffer = ''
+
+    def feed(self, data):
+        """
+        Feed bytes read from the stream.
+
+        :param bytes data: Data read from the stream.
+        :rtype: list
+        :return: The messages completed by this data.
+        """
+        self._buffer += self._text.decode(data)
+        messages = []
+
+        while True:
+            self._buffer = self._buffer.lstrip()
+            if not self._buffer:
+                break
+            try:
+                message, end = self._decoder.raw_decode(self._buffer)
+            except ValueError:
+                break
+            messages.append(message)
+            self._buffer = self._buffer[end:]
+
+        return messages
+
+
+class PipeTransport(object):
+    """
+    Transport over the standard input and output of a process.
+
+    It exposes the subset of the socket interface used by
+    :class:`OvsdbClient`, so a relay process started with ``docker exec -i``
+    can be used as if it were a connection to the OVSDB socket.
+
+    :param process: A :class:`subprocess.Popen` object created with
+     ``stdin=PIPE`` and ``stdout=PIPE``.
+    """
+
+    def __init__(self, process):
+        self._process = process
+
+    def fileno(self):
+        return self._process.stdout.fileno()
+
+    def sendall(self, data):
+        self._process.stdin.write(data)
+        self._process.stdin.flush()
+
+    def recv(self, size):
+        return read(self.fileno(), size)
+
+    def close(self):
+        self._process.stdin.close()
+        self._process.wait()
+
+
+class OvsdbClient(object):
+    """
+    OVSDB JSON-RPC client over a persistent connection.
+
+    Responses are matched with their request by id, so several requests may be
+    sent before waiting for any of their responses. Notifications like monitor
+    ``update`` are queued until :meth:`wait_notification` is called and
+    ``echo`` requests from the server are answered as they arrive.
+
+    :param transport: A connected unix socket or an object with the same
+     ``sendall``, ``recv``, ``fileno`` and ``close`` methods.
+    """
+
+    def __init__(self, transport):
+        self._transport = transport
+        self._decoder = JsonStreamDecoder()
+        self._next_id = 0
+        self._responses = {}
+        self._notifications = deque()
+
+    @classmethod
+    def connect_unix(cls, path=DB_SOCK, timeout=None):
+        """
+        Create a client connected to the OVSDB unix socket in path.
+
+        :param float timeout: Seconds after which connecting or sending to
+         the socket fails, forever if None.
+        """
+        sock = socket(AF_UNIX, SOCK_STREAM)
+        sock.settimeout(timeout)
+        sock.connect(path)
+        return cls(sock)
+
+    def _send(self, message):
+        self._transport.sendall(dumps(message).encode('utf-8'))
+
+    def _read(self, timeout):
+        """
+        Read and dispatch the messages that arrive before timeout.
+
+        :rtype: bool
+        :return: False if nothing was read before timeout.
+        """
+        readable, _, _ = select([self._transport], [], [], timeout)
+        if not readable:
+            return False
+
+        data = self._transport.recv(65536)
+        if not data:
+            raise OvsdbConnectionError(
+                'The OVSDB server closed the connection.'
+            )
+
+        for message in self._decoder.feed(data):
+            method = message.get('method')
+
+            if method == 'echo':
+                self._send({
+                    'result': message['params'], 'error': None,
+                    'id': message['id']
+                })
+            elif method is not None:
+                self._notifications.append(message)
+            else:
+                self._responses[message.get('id')] = message
+
+        return True
+
+    def send_request(self, method, params):
+        """
+        Send a request without waiting for its response.
+
+        :rtype: int
+        :return: The id of the request, to be used with
+         :meth:`wait_response`.
+        """
+        request_id = self._next_id
+        self._next_id += 1
+        self._send({'method': method, 'params': params, 'id': request_id})
+        return request_id
+
+    def wait_response(self, request_id, timeout=None):
+        """
+        Wait for the response of a request sent with :meth:`send_request`.
+
+        :param int request_id: Id of the request.
+        :param float timeout: Seconds to wait, forever if None.
+        :return: The result of the request.
+        """
+        deadline = None if timeout is None else time() + timeout
+
+        while request_id not in self._responses:
+            remaining = None if deadline is None else deadline - time()
+            if remaining is not None and remaining <= 0:
+                raise OvsdbTimeout(
+                    'No response for OVSDB request {} after {} '
+                    'seconds.'.format(request_id, timeout)
+                )
+            self._read(remaining)
+
+        response = self._responses.pop(request_id)
+
+        if response.get('error') is not None:
+            raise OvsdbError(response['error'])
+
+        return response['result']
+
+    def call(self, method, params, timeout=None):
+        """
+        Send a request and wait for its result.
+        """
+        return self.wait_response(
+            self.send_request(method, params), timeout=timeout
+        )
+
+    def transact(self, database, operations, timeout=None):
+        """
+        Execute a list of operations as a single OVSDB transaction.
+
+        :rtype: list
+        :return: The result of each one of the operations.
+        """
+        return self.call(
+            'transact', [database] + list(operations), timeout=timeout
+        )
+
+    def monitor(self, database, monitor_id, requests, timeout=None):
+        """
+        Start an OVSDB monitor.
+
+        :return: The initial table updates, the following ones are received
+         as ``update`` notifications.
+        """
+        return self.call(
+            'monitor', [database, monitor_id, requests], timeout=timeout
+        )
+
+    def wait_notification(self, timeout=None):
+        """
+        Wait for the next notification sent by the server.
+
+        :rtype: dict
+        :return: The notification, or None if none arrived before timeout.
+        """
+        deadline = None if timeout is None else time() + timeout
+
+        while not self._notifications:
+            remaining = None if deadline is None else deadline - time()
+            if remaining is not None and remaining <= 0:
+                return None
+            self._read(remaining)
+
+        return self._notifications.popleft()
+
+    def close(self):
+        self._transport.close()
+
+
+def to_ovsdb(value):
+    """
+    Convert a Python value to its OVSDB JSON notation.
+
+    Dictionaries become maps, lists, tuples and sets become sets and the rest
+    of the values are used as atoms.
+    """
+    if isinstance(value, dict):
+        return ['map', [[key, to_ovsdb(item)] for key, item in value.items()]]
+
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return ['set', [to_ovsdb(item) for item in value]]
+
+    return value
+
+
+def from_ovsdb(value):
+    """
+    Convert a value in OVSDB JSON notation to a Python value.
+
+    Maps become dictionaries, sets become lists and UUIDs become their
+    string.
+    """
+    if not isinstance(value, list):
+        return value
+
+    kind, content = value
+
+    if kind == 'map':
+        return dict(
+            (from_ovsdb(key), from_ovsdb(item)) for key, item in content
+        )
+
+    if kind == 'set':
+        return [from_ovsdb(item) for item in content]
+
+    return content
+
+
+class OvsdbBatch(object):
+    """
+    OVSDB operations queued to be committed as a single transaction.
+
+    Operations are queued with methods named after the ``ovs-vsctl`` commands
+    they replace, and executed together by :meth:`commit`, which returns the
+    result of each one of them in the order they were queued.
+
+    Records are identified by their UUID or by the value of their ``name``
+    column, as ``ovs-vsctl`` does. A record of None, or ``.``, selects all the
+    rows of the table, which is the single row of tables like ``System``.
+
+    :param transact: Function that executes a list of operations in a
+     transaction and returns their results, like
+     :meth:`OvsdbClient.transact` bound to a database.
+    """
+
+    def __init__(self, transact):
+        self._transact = transact
+        self._operations = []
+        self._decoders = []
+
+    def __len__(self):
+        return len(self._decoders)
+
+    @staticmethod
+    def _where(record):
+        if record is None or record == '.':
+            return []
+        if UUID.match(record):
+            return [['_uuid', '==', ['uuid', record]]]
+        return [['name', '==', record]]
+
+    def _queue(self, decoder, *operations):
+        # The decoder gets the result of the last of the operations
+        self._operations.extend(operations)
+        self._decoders.append((decoder, len(operations)))
+        return self
+
+    def get(self, table, record, *columns):
+        """
+        Queue reading columns of a record.
+
+        The result is a dictionary with the value of each column, or None if
+        the record does not exist.
+        """
+        def decoder(result):
+            rows = result['rows']
+            if not rows:
+                return None
+            return dict(
+                (column, from_ovsdb(value))
+                for column, value in rows[0].items()
+            )
+
+        operation = {
+            'op': 'select', 'table': table, 'where': self._where(record)
+        }
+        if columns:
+            operation['columns'] = list(columns)
+
+        return self._queue(decoder, operation)
+
+    def list(self, table, record=None):
+        """
+        Queue reading all the columns of the records of a table.
+
+        The result is a list with a dictionary for each record.
+        """
+        def decoder(result):
+            return [
+                dict(
+                    (column, from_ovsdb(value))
+                    for column, value in row.items()
+                )
+                for row in result['rows']
+            ]
+
+        return self._queue(
+            decoder,
+            {'op': 'select', 'table': table, 'where': self._where(record)}
+        )
+
+    def set(self, table, record, **columns):
+        """
+        Queue setting columns of a record.
+
+        Like ``ovs-vsctl set Interface 1 user_config:admin=up``, a dictionary
+        sets only its keys in a map column, the rest of the keys of the column
+        are kept. Any other value replaces the whole column.
+
+        The result is the number of records updated.
+        """
+        if not columns:
+            raise ValueError('No columns to set.')
+
+        where = self._where(record)
+        operations = []
+
+        row = dict(
+            (column, to_ovsdb(value))
+            for column, value in columns.items()
+            if not isinstance(value, dict)
+        )
+        if row:
+            operations.append(
+                {'op': 'update', 'table': table, 'where': where, 'row': row}
+            )
+
+        # The keys are deleted first, since an insert does not replace the
+        # value of a key already in the map.
+        mutations = []
+        for column, value in columns.items():
+            if isinstance(value, dict):
+                mutations.append(
+                    [column, 'delete', ['set', list(value.keys())]]
+                )
+                mutations.append([column, 'insert', to_ovsdb(value)])
+        if mutations:
+            operations.append({
+                'op': 'mutate', 'table': table, 'where': where,
+                'mutations': mutations
+            })
+
+        return self._queue(lambda result: result['count'], *operations)
+
+    def clear(self, table, record, *columns):
+        """
+        Queue emptying set or map columns of a record.
+
+        The result is the number of records updated.
+        """
+        return self._queue(
+            lambda result: result['count'],
+            {
+                'op': 'update', 'table': table,
+                'where': self._where(record),
+                'row': dict((column, ['set', []]) for column in columns)
+            }
+        )
+
+    def create(self, table, **columns):
+        """
+        Queue creating a record.
+
+        The result is the UUID of the new record.
+        """
+        return self._queue(
+            lambda result: result['uuid'][1],
+            {
+                'op': 'insert', 'table': table,
+                'row': dict(
+                    (column, to_ovsdb(value))
+                    for column, value in columns.items()
+                )
+            }
+        )
+
+    def destroy(self, table, record):
+        """
+        Queue deleting a record.
+
+        The result is the number of records deleted.
+        """
+        return self._queue(
+            lambda result: result['count'],
+            {'op': 'delete', 'table': table, 'where': self._where(record)}
+        )
+
+    def commit(self):
+        """
+        Execute the queued operations in a single transaction.
+
+        The queue is emptied and may be used again.
+
+        :rtype: list
+        :return: The result of each operation, in the order they were queued.
+        """
+        operations, self._operations = self._operations, []
+        decoders, self._decoders = self._decoders, []
+
+        if not operations:
+            return []
+
+        results = self._transact(operations)
+
+        # If an operation fails the transaction is aborted, its result and
+        # the ones after it are errors or missing.
+        for index, result in enumerate(results):
+            if result is not None and 'error' in result:
+                raise OvsdbError(
+                    'OVSDB operation {} of {} failed: {}'.format(
+                        index, dumps(operations[index])
+                        if index < len(operations) else 'commit',
+                        result
+                    )
+                )
+
+        decoded = []
+        position = 0
+
+        for decoder, count in decoders:
+            position += count
+            decoded.append(decoder(results[position - 1]))
+
+        return decoded
+
+
+def relay(path):
+    """
+    Relay the standard input and output of this process to an unix socket.
+    """
+    sock = socket(AF_UNIX, SOCK_STREAM)
+    sock.connect(path)
+
+    input_fd = stdin.fileno()
+    output_fd = stdout.fileno()
+
+    while True:
+        readable, _, _ = select([input_fd, sock], [], [])
+
+        if input_fd in readable:
+            data = read(input_fd, 65536)
+            if not data:
+                break
+            sock.sendall(data)
+
+        if sock in readable:
+            data = sock.recv(65536)
+            if not data:
+                break
+            while data:
+                data = data[write(output_fd, data):]
+
+    sock.close()
+
+
+__all__ = [
+    'DB_SOCK', 'OvsdbError', 'OvsdbTimeout', 'OvsdbConnectionError',
+    'JsonStreamDecoder',
+    'PipeTransport', 'OvsdbClient', 'OvsdbBatch', 'to_ovsdb', 'from_ovsdb'
+]
+
+
+if __name__ == '__main__':
+    if argv[1:2] == ['relay']:
+        relay(argv[2] if len(argv) > 2 else DB_SOCK)
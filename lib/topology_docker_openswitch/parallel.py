@@ -0,0 +1,194 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2016 Hewlett Packard Enterprise Development LP
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""
+Bounded pool of threads used to operate on several nodes at the same time.
+"""
+
+from __future__ import unicode_literals, absolute_import
+from __future__ import print_function, division
+
+from collections import namedtuple, OrderedDict
+from threading import Condition, Lock, Semaphore, Thread
+from time import time
+
+
+TaskResult = namedtuple('TaskResult', ['value', 'error', 'elapsed'])
+"""
+Result of a task run by a :class:`TaskPool`.
+
+``value`` is the return value of the task, ``error`` the exception it raised
+(None if it raised none) and ``elapsed`` the seconds it took to run.
+"""
+
+
+class TaskTimeout(Exception):
+    """
+    Error of a task that did not finish in the time given to it by its pool.
+    """
+
+
+class TaskPool(object):
+    """
+    Pool of threads that run tasks identified by a key.
+
+    Every task gets its own daemon thread, but no more than ``workers`` of
+    them run at the same time. Tasks may be submitted at any moment and their
+    results are collected with :meth:`join`.
+
+    A task that runs for more than ``timeout`` seconds is abandoned: its
+    result is a :class:`TaskTimeout` error. Its thread can not be stopped, so
+    it keeps its place until it ends and tasks should bound their own work by
+    the timeout. Use :meth:`wait_abandoned` before removing what abandoned
+    tasks may still be writing to. Being daemons, their threads will not
+    prevent the interpreter from exiting.
+
+    :param int workers: Maximum number of tasks running at the same time.
+    :param float timeout: Seconds each task may run, None to wait forever.
+    """
+
+    def __init__(self, workers, timeout=None):
+        self._slots = Semaphore(max(workers, 1))
+        self._timeout = timeout
+        self._done = Condition(Lock())
+        self._tasks = OrderedDict()
+        self._abandoned = []
+
+    def submit(self, key, function, *args, **kwargs):
+        """
+        Run ``function(*args, **kwargs)`` as the task identified by key.
+        """
+        task = {'start': None, 'result': None}
+        task['thread'] = Thread(
+            target=self._run, args=(task, function, args, kwargs)
+        )
+        task['thread'].daemon = True
+
+        with self._done:
+            self._tasks[key] = task
+
+        task['thread'].start()
+
+    def _run(self, task, function, args, kwargs):
+        self._slots.acquire()
+
+        with self._done:
+            task['start'] = time()
+            self._done.notify_all()
+
+        value = None
+        error = None
+
+        try:
+            value = function(*args, **kwargs)
+        except Exception as e:
+            error = e
+
+        with self._done:
+            # An abandoned task already has a result
+            if task['result'] is None:
+                task['result'] = TaskResult(
+                    value, error, time() - task['start']
+                )
+            self._slots.release()
+            self._done.notify_all()
+
+    def join(self):
+        """
+        Wait for all the submitted tasks to finish or to be abandoned.
+
+        :rtype: OrderedDict
+        :return: A :class:`TaskResult` for each task key, in submission
+         order. The pool is emptied and may be used again.
+        """
+        with self._done:
+            while True:
+                pending = [
+                    task for task in self._tasks.values()
+                    if task['result'] is None
+                ]
+                if not pending:
+                    break
+
+                wait = None
+                now = time()
+
+                for task in pending:
+                    if self._timeout is None or task['start'] is None:
+                        continue
+
+                    left = task['start'] + self._timeout - now
+
+                    if left > 0:
+                        wait = left if wait is None else min(wait, left)
+                        continue
+
+                    task['result'] = TaskResult(
+                        None,
+                        TaskTimeout(
+                            'Task did not finish after {} seconds.'.format(
+                                self._timeout
+                            )
+                        ),
+                        now - task['start']
+                    )
+                    task['abandoned'] = True
+                    wait = 0
+
+                if wait != 0:
+                    self._done.wait(wait)
+
+            results = OrderedDict(
+                (key, task['result']) for key, task in self._tasks.items()
+            )
+
+            for key, task in self._tasks.items():
+                if task.get('abandoned'):
+                    self._abandoned.append((key, task['thread']))
+
+            self._tasks = OrderedDict()
+
+        return results
+
+    def wait_abandoned(self, timeout=None):
+        """
+        Wait for the threads of the tasks abandoned by :meth:`join` to end.
+
+        :param float timeout: Seconds to wait, forever if None.
+        :rtype: list
+        :return: The keys of the abandoned tasks still running.
+        """
+        deadline = None if timeout is None else time() + timeout
+
+        with self._done:
+            abandoned = list(self._abandoned)
+
+        for key, thread in abandoned:
+            thread.join(
+                None if deadline is None else max(deadline - time(), 0)
+            )
+
+        with self._done:
+            self._abandoned = [
+                (key, thread) for key, thread in self._abandoned
+                if thread.is_alive()
+            ]
+
+            return [key for key, thread in self._abandoned]
+
+
+__all__ = ['TaskResult', 'TaskTimeout', 'TaskPool']
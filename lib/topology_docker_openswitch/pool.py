@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2016 Hewlett Packard Enterprise Development LP
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""
+Pool of shell sessions of a node shared by several threads.
+"""
+
+from __future__ import unicode_literals, absolute_import
+from __future__ import print_function, division
+
+from contextlib import contextmanager
+
+from six.moves.queue import Empty, Queue
+
+from topology.platforms.shell import NonExistingConnectionError
+
+
+class SessionPoolTimeout(Exception):
+    """
+    Raised when no session of a pool is released in time.
+    """
+
+
+class SessionPool(object):
+    """
+    Pool of shells of a node, each one with its own session.
+
+    A thread checks a shell out, uses it for a command or a block of commands
+    and checks it in again, so threads never share a session. When a shell is
+    checked in, its last output is checked for crashes with its
+    ``_handle_crash`` method and, if the shell crashed, it is disconnected so
+    its next user gets a new session.
+
+    :param list shells: The shells of the pool.
+    """
+
+    def __init__(self, shells):
+        self.shells = list(shells)
+        self._idle = Queue()
+
+        for shell in self.shells:
+            self._idle.put(shell)
+
+    def checkout(self, timeout=None):
+        """
+        Take a shell of the pool, waiting for one to be checked in if all of
+        them are in use.
+
+        :param float timeout: Seconds to wait, forever if None.
+        """
+        try:
+            return self._idle.get(timeout=timeout)
+        except Empty:
+            raise SessionPoolTimeout(
+                'No session released after {} seconds.'.format(timeout)
+            )
+
+    def checkin(self, shell):
+        """
+        Return a shell to the pool.
+        """
+        try:
+            if shell.is_connected():
+                shell._handle_crash(None)
+        except NonExistingConnectionError:
+            pass
+        except Exception:
+            shell.disconnect()
+
+        self._idle.put(shell)
+
+    @contextmanager
+    def session(self, timeout=None):
+        """
+        Context manager that checks a shell out and in again.
+
+        ::
+
+            with pool.session() as vtysh:
+                vtysh.send_command('configure terminal')
+                vtysh.send_command('interface 1')
+        """
+        shell = self.checkout(timeout=timeout)
+
+        try:
+            yield shell
+        finally:
+            self.checkin(shell)
+
+    def send_command(self, command, timeout=None, silent=False):
+        """
+        Send a command with a shell of the pool and get its response.
+
+        :param float timeout: Seconds to wait for the response.
+        """
+        with self.session() as shell:
+            shell.send_command(command, timeout=timeout, silent=silent)
+            return shell.get_response(silent=silent)
+
+
+__all__ = ['SessionPoolTimeout', 'SessionPool']
@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2016 Hewlett Packard Enterprise Development LP
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""
+Compressed archival of the artifacts of the nodes.
+"""
+
+from __future__ import unicode_literals, absolute_import
+from __future__ import print_function, division
+
+from hashlib import sha256
+from io import BytesIO
+from os import walk
+from os.path import basename, getsize, join, relpath
+from tarfile import TarInfo, open as tar_open
+from threading import Lock
+from time import time
+
+
+class ArtifactArchiver(object):
+    """
+    Archive the artifacts of each test in a single compressed tarball.
+
+    Files are streamed from their directories to the tarball. A file whose
+    content is identical to one already archived, in this or in a previous
+    tarball, is not archived again but listed in the ``MANIFEST`` member of
+    the tarball, with the tarball and member where its content can be found.
+    Files that would make the tarball go over ``max_bytes`` of uncompressed
+    content are skipped and listed there too.
+
+    :param int compresslevel: gzip compression level, from 0 to 9.
+    :param int max_bytes: Maximum bytes of content of each tarball, None for
+     no limit.
+    """
+
+    def __init__(self, compresslevel=6, max_bytes=None):
+        self.compresslevel = compresslevel
+        self.max_bytes = max_bytes
+        self._archived = {}
+        self._lock = Lock()
+
+    @staticmethod
+    def _digest(path):
+        digest = sha256()
+        with open(path, 'rb') as fd:
+            for chunk in iter(lambda: fd.read(65536), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def archive(self, archive_path, directories):
+        """
+        Archive several directories in a gzip compressed tarball.
+
+        :param str archive_path: Path of the tarball to create.
+        :param dict directories: Maps the name of each directory in the
+         tarball to its path.
+        :rtype: list
+        :return: The warnings found while archiving.
+        """
+        warnings = []
+        manifest = []
+        total = 0
+
+        with tar_open(
+            archive_path, 'w:gz', compresslevel=self.compresslevel
+        ) as tar:
+            for name, directory in sorted(directories.items()):
+                for root, _, files in walk(directory):
+                    for filename in sorted(files):
+                        path = join(root, filename)
+                        member = join(name, relpath(path, directory))
+
+                        try:
+                            digest = self._digest(path)
+                            size = getsize(path)
+                        except (IOError, OSError) as error:
+                            warnings.append(
+                                'Unable to archive file {}, Error {}'.format(
+                                    path, error
+                                )
+                            )
+                            continue
+
+                        with self._lock:
+                            original = self._archived.get(digest)
+
+                        if original is not None:
+                            manifest.append(
+                                '{} {} duplicate of {}:{}'.format(
+                                    member, digest, *original
+                                )
+                            )
+                            continue
+
+                        if self.max_bytes is not None and \
+                                total + size > self.max_bytes:
+                            manifest.append(
+                                '{} {} skipped, file of {} bytes would be {} '
+                                'bytes over the limit of {}'.format(
+                                    member, digest, size,
+                                    total + size - self.max_bytes,
+                                    self.max_bytes
+                                )
+                            )
+                            warnings.append(
+                                'File {} not archived, the archive would be '
+                                'over {} bytes.'.format(path, self.max_bytes)
+                            )
+                            continue
+
+                        tar.add(path, member)
+                        total += size
+
+                        with self._lock:
+                            self._archived[digest] = (
+                                basename(archive_path), member
+                            )
+
+            if manifest:
+                content = '\n'.join(manifest + ['']).encode('utf-8')
+                info = TarInfo('MANIFEST')
+                info.size = len(content)
+                info.mtime = time()
+                tar.addfile(info, BytesIO(content))
+
+        return warnings
+
+
+__all__ = ['ArtifactArchiver']
@@ -0,0 +1,268 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2016 Hewlett Packard Enterprise Development LP
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""
+Collection of the logs and coredumps of the OpenSwitch nodes after each test.
+
+Only what was written since the previous collection is collected, the
+offsets and coredumps already collected are remembered for each node by
+container.
+"""
+
+from __future__ import unicode_literals, absolute_import
+from __future__ import print_function, division
+
+from math import ceil
+from os.path import basename, join
+from shutil import copytree, Error, rmtree
+from time import time
+
+from topology_docker_openswitch.parallel import TaskTimeout
+
+# Log file collected from each node.
+LOGS_PATH = '/var/log/messages'
+
+# Directory of the coredumps collected from each node.
+CORE_PATH = '/var/diagnostics/coredump'
+
+# Inode and size of the log file of each node, by container, the last time it
+# was collected or skipped.
+LOG_OFFSETS = {}
+
+# Name, size and modification time of the coredumps of each node, by
+# container, that were already collected.
+CORE_INDEX = {}
+
+
+def _bounded(command, timeout):
+    # The command is killed in the container once the timeout is over
+    if timeout is None:
+        return command
+
+    return 'timeout {} {}'.format(int(ceil(timeout)), command)
+
+
+def collect_new_log_bytes(node_obj, logs_path, destination, timeout=None):
+    """
+    Append to destination the bytes written to logs_path since the previous
+    call.
+
+    The inode and size of the file at the end of each call are remembered in
+    LOG_OFFSETS for each node. If the inode changed or the file shrank, the
+    file was rotated or truncated and it is copied from its beginning. Both
+    paths are in the container, a single command is run in it.
+
+    :param float timeout: Seconds after which the command is killed.
+    """
+    inode, offset = LOG_OFFSETS.get(node_obj.container_id, (None, 0))
+
+    script = (
+        'set -- $(stat -c \'%i %s\' {logs_path}) && '
+        'if [ $1 = {inode} ] && [ $2 -ge {offset} ]; '
+        'then start={offset}; else start=0; fi && '
+        'echo Output of: {logs_path} from byte $start >> {destination} && '
+        'tail -c +$((start + 1)) {logs_path} | head -c $(($2 - start)) '
+        '>> {destination} && '
+        'echo >> {destination} && '
+        'echo $1 $2'
+    ).format(**locals())
+
+    output = node_obj._exec(_bounded('sh -c "{}"'.format(script), timeout))
+    inode, size = output.split()[-2:]
+
+    LOG_OFFSETS[node_obj.container_id] = (inode, int(size))
+
+
+def skip_new_log_bytes(node_obj, logs_path, timeout=None):
+    """
+    Skip the bytes written to logs_path since the previous call to this
+    function or to :func:`collect_new_log_bytes`.
+
+    The inode and size of the file are remembered in LOG_OFFSETS for the node
+    with a single ``stat`` run in the container, so the next collection
+    starts at the end of the file.
+
+    :param float timeout: Seconds after which the command is killed.
+    """
+    inode, size = node_obj._exec(
+        _bounded('stat -c \'%i %s\' {}'.format(logs_path), timeout)
+    ).split()
+
+    LOG_OFFSETS[node_obj.container_id] = (inode, int(size))
+
+
+def collect_new_cores(
+    node_obj, core_path, destination, max_bytes=None, timeout=None
+):
+    """
+    Store in the destination tarball the coredumps of core_path that were not
+    collected before.
+
+    The coredumps are listed with their size and modification time by a
+    single command run in the container and compared with the ones in
+    CORE_INDEX for the node, the new ones are compressed together by another
+    one. A coredump that would take the new ones over max_bytes is skipped,
+    and not indexed so it is tried again after the next test. Both paths are
+    in the container.
+
+    :param int max_bytes: Maximum bytes of new coredumps, None for no limit.
+    :param float timeout: Seconds after which the commands are killed.
+    :rtype: list
+    :return: The warnings found while collecting the coredumps.
+    """
+    warnings = []
+    collected = CORE_INDEX.setdefault(node_obj.container_id, set())
+    deadline = None if timeout is None else time() + timeout
+
+    listing = node_obj._exec(_bounded(
+        'sh -c "for core in {}/core*; do '
+        '[ -f $core ] && stat -c \'%s %Y %n\' $core; done; true"'.format(
+            core_path
+        ),
+        timeout
+    ))
+
+    new_cores = []
+    total = 0
+
+    for line in listing.splitlines():
+        size, mtime, name = line.split(None, 2)
+        core = (name, int(size), int(mtime))
+
+        if core in collected:
+            continue
+
+        if max_bytes is not None and total + core[1] > max_bytes:
+            warnings.append(
+                'Coredump {} of node {} not collected, it would be over {} '
+                'bytes.'.format(name, node_obj.identifier, max_bytes)
+            )
+            continue
+
+        new_cores.append(core)
+        total += core[1]
+
+    if not new_cores:
+        return warnings
+
+    node_obj._exec(_bounded(
+        'tar czf {} {}'.format(
+            destination, ' '.join(core[0] for core in new_cores)
+        ),
+        None if deadline is None else max(deadline - time(), 1)
+    ))
+    collected.update(new_cores)
+
+    return warnings
+
+
+def collect_node_artifacts(
+    node_obj, path_name, copy=True, core_max_bytes=None, timeout=None
+):
+    """
+    Collect the artifacts of an OpenSwitch node in path_name.
+
+    The part of the log file written since the previous collection and the
+    new coredumps of the node are copied to its shared folder, which is then
+    copied to path_name. In archive mode the shared folder is left in place
+    to be archived once all the nodes are collected.
+
+    Every command run in the container is killed once timeout seconds have
+    passed since the start of the collection, and nothing else is done after
+    that, so a collection abandoned by its pool does not write afterwards.
+
+    :param str path_name: Directory of the artifacts of the test.
+    :param bool copy: False to leave the shared folder in place.
+    :param int core_max_bytes: Maximum bytes of new coredumps, None for no
+     limit.
+    :param float timeout: Seconds the collection may take, None for no limit.
+    :rtype: list
+    :return: The warnings found while collecting the artifacts.
+    """
+    warnings = []
+    shared_dir = node_obj.shared_dir
+    deadline = None if timeout is None else time() + timeout
+
+    def remaining():
+        if deadline is None:
+            return None
+
+        left = deadline - time()
+        if left <= 0:
+            raise TaskTimeout(
+                'Collection of node {} did not finish after {} '
+                'seconds.'.format(node_obj.identifier, timeout)
+            )
+        return left
+
+    left = remaining()
+
+    try:
+        collect_new_log_bytes(
+            node_obj, LOGS_PATH,
+            join(node_obj.shared_dir_mount, 'container_logs'), timeout=left
+        )
+    except Exception:
+        warnings.append(
+            'Unable to get {} from node {}.'.format(
+                LOGS_PATH, node_obj.identifier
+            )
+        )
+
+    left = remaining()
+
+    try:
+        warnings.extend(
+            collect_new_cores(
+                node_obj, CORE_PATH,
+                join(node_obj.shared_dir_mount, 'coredumps.tar.gz'),
+                max_bytes=core_max_bytes, timeout=left
+            )
+        )
+    except Exception:
+        warnings.append(
+            'Unable to get coredumps from node {}.'.format(
+                node_obj.identifier
+            )
+        )
+
+    if not copy:
+        return warnings
+
+    remaining()
+
+    try:
+        copytree(shared_dir, join(path_name, basename(shared_dir)))
+        rmtree(shared_dir)
+    except Error as err:
+        errors = err.args[0]
+        for error in errors:
+            src, dest, msg = error
+            warnings.append(
+                'Unable to copy file {}, Error {}'.format(
+                    src, msg
+                )
+            )
+
+    return warnings
+
+
+__all__ = [
+    'LOGS_PATH', 'CORE_PATH', 'LOG_OFFSETS', 'CORE_INDEX',
+    'collect_new_log_bytes', 'skip_new_log_bytes', 'collect_new_cores',
+    'collect_node_artifacts'
+]
@@ -15,12 +15,342 @@
 # specific language governing permissions and limitations
 # under the License.
 
+from os import getpid
 from os.path import exists, basename, splitext, join
 from shutil import copytree, Error, rmtree
-from logging import warning
+from logging import info, warning
 from datetime import datetime
+from collections import OrderedDict
 
-from topology_docker_openswitch.openswitch import log_commands
+from pytest import fixture, hookimpl
+
+from topology_docker_openswitch import openswitch
+from topology_docker_openswitch.cache import CAPABILITIES
+from topology_docker_openswitch.parallel import TaskPool
+from topology_docker_openswitch.openswitch import BringUpError, join_bringup
+from topology_docker_openswitch.fanout import fan_out, openswitch_nodes
+from topology_docker_openswitch.pytest.archive import ArtifactArchiver
+from topology_docker_openswitch.pytest.collect import (
+    LOGS_PATH, skip_new_log_bytes, collect_node_artifacts
+)
+from topology_docker_openswitch.pytest.results import (
+    SUMMARY_FILE, item_failed, write_test_summary, record_entry,
+    prune_log_dir, summarize_boot_profiles
+)
+
+# Archiver of the artifacts of each test, None if they are copied as they are.
+ARCHIVER = None
+
+# Identifier of this session, recorded with the entries it creates in the log
+# directory.
+SESSION = None
+
+# Maximum bytes of new coredumps collected from a node after each test, None
+# for no limit.
+CORE_MAX_BYTES = None
+
+
+def pytest_addoption(parser):
+    """
+    pytest hook to add the OpenSwitch node options.
+    """
+    group = parser.getgroup('topology', 'Testing of network topologies')
+    group.addoption(
+        '--topology-openswitch-bringup-workers',
+        default=0,
+        type=int,
+        help=(
+            'Number of OpenSwitch nodes to set up at the same time, '
+            '0 sets them up one after the other'
+        )
+    )
+    group.addoption(
+        '--topology-openswitch-stream-journal',
+        action='store_true',
+        default=False,
+        help=(
+            'Write the journal of each OpenSwitch node and the debug log of '
+            'its setup script to its shared folder while it boots'
+        )
+    )
+    group.addoption(
+        '--topology-openswitch-prewarm-shells',
+        default='',
+        help=(
+            'Comma separated names of the shells of each OpenSwitch node, '
+            'like vtysh,bash, connected in the background once the node is '
+            'set up'
+        )
+    )
+    group.addoption(
+        '--topology-openswitch-agent',
+        action='store_true',
+        default=False,
+        help=(
+            'Start an agent in each OpenSwitch node to run the commands of '
+            'the node instead of a docker exec for each one of them'
+        )
+    )
+    group.addoption(
+        '--topology-openswitch-vtysh-pool-size',
+        default=2,
+        type=int,
+        help='Number of vtysh sessions of the pool of each OpenSwitch node'
+    )
+    group.addoption(
+        '--topology-openswitch-collect-workers',
+        default=8,
+        type=int,
+        help=(
+            'Number of OpenSwitch nodes whose artifacts are collected at the '
+            'same time after each test'
+        )
+    )
+    group.addoption(
+        '--topology-openswitch-collect-timeout',
+        default=300,
+        type=float,
+        help=(
+            'Seconds given to each OpenSwitch node to collect its artifacts '
+            'after each test'
+        )
+    )
+    group.addoption(
+        '--topology-openswitch-cache-dir',
+        default=None,
+        help=(
+            'Directory where the capabilities probed in each OpenSwitch '
+            'image are cached between sessions'
+        )
+    )
+    group.addoption(
+        '--topology-openswitch-archive',
+        action='store_true',
+        default=False,
+        help=(
+            'Store the artifacts of the OpenSwitch nodes of each test in a '
+            'compressed tarball, files already archived by a previous test '
+            'are only listed in its manifest'
+        )
+    )
+    group.addoption(
+        '--topology-openswitch-archive-level',
+        default=6,
+        type=int,
+        help='Compression level of the artifact tarballs, from 0 to 9'
+    )
+    group.addoption(
+        '--topology-openswitch-archive-max-bytes',
+        default=None,
+        type=int,
+        help=(
+            'Maximum bytes of artifacts stored in the tarball of each test, '
+            'files beyond it are skipped'
+        )
+    )
+    group.addoption(
+        '--topology-openswitch-collect-failed-only',
+        action='store_true',
+        default=False,
+        help=(
+            'Collect the artifacts of the OpenSwitch nodes only for failed '
+            'tests, passed tests are summarized in {}'.format(SUMMARY_FILE)
+        )
+    )
+    group.addoption(
+        '--topology-openswitch-retain-sessions',
+        default=None,
+        type=int,
+        help=(
+            'Number of sessions whose test artifact entries are kept in the '
+            'log directory at the end of the session, the entries of the '
+            'oldest ones are removed'
+        )
+    )
+    group.addoption(
+        '--topology-openswitch-retain-bytes',
+        default=None,
+        type=int,
+        help=(
+            'Bytes of test artifact entries kept in the log directory at the '
+            'end of the session, the entries of the oldest sessions are '
+            'removed'
+        )
+    )
+    group.addoption(
+        '--topology-openswitch-core-max-bytes',
+        default=None,
+        type=int,
+        help=(
+            'Maximum bytes of new coredumps collected from each OpenSwitch '
+            'node after each test, bigger ones are skipped'
+        )
+    )
+
+
+def pytest_configure(config):
+    """
+    pytest hook to configure the OpenSwitch nodes with the plugin options.
+    """
+    openswitch.BRINGUP_WORKERS = config.getoption(
+        '--topology-openswitch-bringup-workers'
+    )
+    openswitch.STREAM_BOOT_JOURNAL = config.getoption(
+        '--topology-openswitch-stream-journal'
+    )
+    openswitch.PREWARM_SHELLS = [
+        shell for shell in config.getoption(
+            '--topology-openswitch-prewarm-shells'
+        ).split(',') if shell
+    ]
+    openswitch.USE_AGENT = config.getoption('--topology-openswitch-agent')
+    openswitch.VTYSH_POOL_SIZE = config.getoption(
+        '--topology-openswitch-vtysh-pool-size'
+    )
+    CAPABILITIES.cache_dir = config.getoption(
+        '--topology-openswitch-cache-dir'
+    )
+    openswitch.LOG_HEALTHY_NODES = not config.getoption(
+        '--topology-openswitch-collect-failed-only'
+    )
+
+    global ARCHIVER, CORE_MAX_BYTES, SESSION
+
+    SESSION = '{}_{}'.format(
+        datetime.now().strftime('%Y_%m_%d_%H_%M_%S'), getpid()
+    )
+    CORE_MAX_BYTES = config.getoption('--topology-openswitch-core-max-bytes')
+
+    if config.getoption('--topology-openswitch-archive'):
+        ARCHIVER = ArtifactArchiver(
+            compresslevel=config.getoption(
+                '--topology-openswitch-archive-level'
+            ),
+            max_bytes=config.getoption(
+                '--topology-openswitch-archive-max-bytes'
+            )
+        )
+
+
+@hookimpl(hookwrapper=True)
+def pytest_fixture_setup(fixturedef, request):
+    """
+    pytest hook to wait for the OpenSwitch nodes set up in the background.
+
+    The topology fixture builds the topology, every OpenSwitch node of it
+    must have finished its setup before it is handed to the test.
+
+    pytest has already cached the topology when the setup of its nodes fails,
+    so the error is kept in the topology and raised again by
+    :func:`pytest_runtest_setup` for the following tests that use it.
+    """
+    outcome = yield
+
+    if fixturedef.argname != 'topology' or outcome.excinfo is not None:
+        return
+
+    try:
+        join_bringup()
+    except BringUpError as error:
+        outcome.get_result().topology_openswitch_bringup_error = error
+        raise
+
+
+@hookimpl(hookwrapper=True)
+def pytest_runtest_setup(item):
+    """
+    pytest hook to fail the tests whose topology failed to be set up.
+    """
+    outcome = yield
+
+    if outcome.excinfo is not None:
+        return
+
+    topology = getattr(item, 'funcargs', {}).get('topology', None)
+    error = getattr(topology, 'topology_openswitch_bringup_error', None)
+
+    if error is not None:
+        raise error
+
+
+@fixture
+def openswitch_fanout(topology):
+    """
+    Fixture to send commands to the OpenSwitch nodes of the topology at the
+    same time.
+
+    It is a function that takes the commands and, optionally, the shell, the
+    identifiers of the nodes (all the OpenSwitch nodes if None), the number of
+    workers and the timeout, and returns the result of each node. See
+    :func:`topology_docker_openswitch.fanout.fan_out`.
+    """
+    def send(commands, shell='vtysh', nodes=None, workers=8, timeout=None):
+        return fan_out(
+            openswitch_nodes(topology, nodes), commands, shell=shell,
+            workers=workers, timeout=timeout
+        )
+
+    return send
+
+
+@hookimpl(hookwrapper=True)
+def pytest_runtest_makereport(item, call):
+    """
+    pytest hook to keep the report of each phase of a test in the test item.
+
+    The reports are used in the teardown to know if the test failed.
+    """
+    outcome = yield
+
+    report = outcome.get_result()
+
+    if not hasattr(item, 'topology_openswitch_reports'):
+        item.topology_openswitch_reports = {}
+
+    item.topology_openswitch_reports[report.when] = report
+
+
+def pytest_sessionfinish(session):
+    """
+    pytest hook to apply the retention policy to the log directory.
+    """
+    config = session.config
+
+    log_dir = config.getoption('--topology-log-dir')
+    max_sessions = config.getoption('--topology-openswitch-retain-sessions')
+    max_bytes = config.getoption('--topology-openswitch-retain-bytes')
+
+    if not log_dir or not exists(log_dir) or \
+            (max_sessions is None and max_bytes is None):
+        return
+
+    for path in prune_log_dir(log_dir, max_sessions, max_bytes):
+        info('Removed old test artifacts {}.'.format(path))
+
+
+def pytest_terminal_summary(terminalreporter):
+    """
+    pytest hook to report how long each boot phase of the OpenSwitch nodes
+    took.
+    """
+    summary = summarize_boot_profiles(openswitch.BOOT_PROFILES)
+
+    if not summary:
+        return
+
+    terminalreporter.write_sep(
+        '=', 'OpenSwitch boot profile of {} nodes'.format(
+            len(openswitch.BOOT_PROFILES)
+        )
+    )
+    terminalreporter.write_line(
+        '{:<16}{:>10}{:>10}{:>10}'.format('phase', 'min', 'median', 'p95')
+    )
+
+    for phase, values in summary.items():
+        terminalreporter.write_line(
+            '{:<16}{:>10.3f}{:>10.3f}{:>10.3f}'.format(phase, *values)
+        )
 
 
 def pytest_runtest_teardown(item):
@@ -29,7 +359,10 @@ def pytest_runtest_teardown(item):
 
     This creates a folder with the name of the test case, copies the folders
     defined in the shared_dir_mount attribute of each openswitch container
-    and the /var/log/messages file inside.
+    and the /var/log/messages file inside. The nodes are collected
+    concurrently and the warnings found are reported once all of them are
+    done. In archive mode the folders of all the nodes are stored in a single
+    compressed tarball instead.
 
     FIXME: document the item argument
     """
@@ -83,61 +416,77 @@ def pytest_runtest_teardown(item):
     if topology.engine != 'docker':
         return
 
-    logs_path = '/var/log/messages'
-
-    for node in topology.nodes:
-        node_obj = topology.get(node)
+    nodes = openswitch_nodes(topology)
 
-        if node_obj.metadata.get('type', None) != 'openswitch':
-            return
+    # The nodes are collected at the same time, each one with a time budget so
+    # a hung node does not stall the whole teardown. The commands of each node
+    # are bounded by the same budget, so an abandoned node stops on its own.
+    collect_timeout = config.getoption('--topology-openswitch-collect-timeout')
+    pool = TaskPool(
+        config.getoption('--topology-openswitch-collect-workers'),
+        timeout=collect_timeout
+    )
 
-        shared_dir = node_obj.shared_dir
+    if config.getoption('--topology-openswitch-collect-failed-only') and \
+            not item_failed(item):
+        write_test_summary(topology_log_dir, item, nodes)
 
-        try:
-            commands = ['cat {}'.format(logs_path)]
-            log_commands(
-                commands, join(node_obj.shared_dir_mount, 'container_logs'),
-                node_obj._docker_exec, prefix=r'sh -c "', suffix=r'"'
-            )
-        except:
-            warning(
-                'Unable to get {} from node {}.'.format(
-                    logs_path, node_obj.identifier
-                )
+        # The logs written during this test are skipped, so the next failed
+        # test collects only its own.
+        for node_obj in nodes:
+            pool.submit(
+                node_obj.identifier, skip_new_log_bytes, node_obj, LOGS_PATH,
+                timeout=collect_timeout
             )
 
-        bash_shell = node_obj.get_shell('bash')
+        for identifier, result in pool.join().items():
+            if result.error is not None:
+                warning(
+                    'Unable to skip the logs of node {}: {}'.format(
+                        identifier, result.error
+                    )
+                )
 
-        try:
-            core_path = '/var/diagnostics/coredump'
+        pool.wait_abandoned()
+        return
 
-            bash_shell.send_command(
-                'ls -1 {}/core* 2>/dev/null'.format(core_path), silent=True
-            )
+    for node_obj in nodes:
+        pool.submit(
+            node_obj.identifier, collect_node_artifacts, node_obj, path_name,
+            copy=ARCHIVER is None, core_max_bytes=CORE_MAX_BYTES,
+            timeout=collect_timeout
+        )
 
-            core_files = bash_shell.get_response(silent=True).splitlines()
+    shared_dirs = OrderedDict()
 
-            for core_file in core_files:
-                bash_shell.send_command(
-                    'cp {core_file} /tmp'.format(**locals()),
-                    silent=True
-                )
-        except:
+    for node_obj, (identifier, result) in zip(nodes, pool.join().items()):
+        if result.error is not None:
             warning(
-                'Unable to get coredumps from node {}.'.format(
-                    node_obj.identifier
+                'Unable to collect artifacts from node {}: {}'.format(
+                    identifier, result.error
                 )
             )
+            continue
+
+        for message in result.value:
+            warning(message)
+
+        if exists(node_obj.shared_dir):
+            shared_dirs[basename(node_obj.shared_dir)] = node_obj.shared_dir
+
+    # The commands of the abandoned nodes are killed when their budget is
+    # over, nothing is removed while they may still be writing.
+    pool.wait_abandoned()
 
-        try:
-            copytree(shared_dir, join(path_name, basename(shared_dir)))
+    if ARCHIVER is not None and shared_dirs:
+        path_name = '{}.tar.gz'.format(path_name)
+
+        for message in ARCHIVER.archive(path_name, shared_dirs):
+            warning(message)
+
+        for shared_dir in shared_dirs.values():
             rmtree(shared_dir)
-        except Error as err:
-            errors = err.args[0]
-            for error in errors:
-                src, dest, msg = error
-                warning(
-                    'Unable to copy file {}, Error {}'.format(
-                        src, msg
-                    )
-                )
+
+    # The entries are grouped by session when the log directory is pruned
+    if exists(path_name):
+        record_entry(topology_log_dir, SESSION, basename(path_name))
@@ -0,0 +1,221 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2016 Hewlett Packard Enterprise Development LP
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""
+Results of the tests and the artifacts they leave in the log directory.
+"""
+
+from __future__ import unicode_literals, absolute_import
+from __future__ import print_function, division
+
+from os import listdir, makedirs, remove, walk
+from os.path import basename, exists, getmtime, getsize, isdir, join
+from shutil import rmtree
+from json import dumps, loads
+from re import compile as regex
+from collections import OrderedDict
+from math import ceil
+
+# Name of the entries created in the log directory for each test, as
+# <suite>_<test>_<timestamp>, optionally archived.
+ENTRY_NAME = regex(r'_\d{4}(_\d{2}){5}(\.tar\.gz)?$')
+
+# File of the log directory where the summary of the tests whose artifacts are
+# not collected is appended.
+SUMMARY_FILE = 'openswitch_summary.jsonl'
+
+# File of the log directory where the session that created each entry is
+# recorded.
+SESSIONS_FILE = 'openswitch_sessions.jsonl'
+
+
+def item_failed(item):
+    """
+    Tell if the setup or the call of a test failed.
+    """
+    reports = getattr(item, 'topology_openswitch_reports', {})
+
+    return any(report.failed for report in reports.values())
+
+
+def write_test_summary(log_dir, item, nodes):
+    """
+    Append to the summary file of log_dir a line for a test whose artifacts
+    are not collected.
+
+    The line is a JSON object with the test id, its outcome, the seconds it
+    took and the boot profile of every OpenSwitch node of its topology.
+    """
+    reports = getattr(item, 'topology_openswitch_reports', {})
+
+    summary = OrderedDict([
+        ('test', item.nodeid),
+        ('outcome', reports['call'].outcome if 'call' in reports else None),
+        ('duration', sum(report.duration for report in reports.values())),
+        ('nodes', OrderedDict(
+            (node_obj.identifier, node_obj.boot_profile) for node_obj in nodes
+        ))
+    ])
+
+    if not exists(log_dir):
+        makedirs(log_dir)
+
+    with open(join(log_dir, SUMMARY_FILE), 'a') as fd:
+        fd.write('{}\n'.format(dumps(summary)))
+
+
+def record_entry(log_dir, session, entry):
+    """
+    Append to the sessions file of log_dir the session that created an entry.
+
+    :param str session: Identifier of the session.
+    :param str entry: Name of the entry in log_dir.
+    """
+    with open(join(log_dir, SESSIONS_FILE), 'a') as fd:
+        fd.write('{}\n'.format(
+            dumps(OrderedDict([('session', session), ('entry', entry)]))
+        ))
+
+
+def entry_size(path):
+    """
+    Bytes of a file, or of all the files of a directory.
+    """
+    if not isdir(path):
+        return getsize(path)
+
+    return sum(
+        getsize(join(root, filename))
+        for root, _, files in walk(path) for filename in files
+    )
+
+
+def prune_log_dir(log_dir, max_sessions=None, max_bytes=None):
+    """
+    Remove the test artifact entries of the oldest sessions of log_dir.
+
+    Only the entries created by this plugin, named after their test and
+    timestamp, are considered. They are grouped by the session that created
+    them, as recorded in the sessions file, an entry not recorded there being
+    a session on its own. The newest sessions are kept until there are
+    max_sessions of them or their entries add up to max_bytes, but the newest
+    one is always kept.
+
+    Sessions are removed as a whole, so the files of an archived entry listed
+    as duplicates in its ``MANIFEST``, which are always found in an entry of
+    the same session, are kept as long as the entry is.
+
+    :rtype: list
+    :return: The paths removed.
+    """
+    sessions_path = join(log_dir, SESSIONS_FILE)
+    records = []
+
+    if exists(sessions_path):
+        with open(sessions_path) as fd:
+            for line in fd:
+                try:
+                    records.append(loads(line, object_pairs_hook=OrderedDict))
+                except ValueError:
+                    continue
+
+    entry_sessions = dict(
+        (record['entry'], record['session']) for record in records
+    )
+
+    sessions = OrderedDict()
+
+    for name in listdir(log_dir):
+        if ENTRY_NAME.search(name):
+            sessions.setdefault(entry_sessions.get(name, name), []).append(
+                join(log_dir, name)
+            )
+
+    # The newest session first, by the time of its newest entry
+    ordered = sorted(
+        sessions.values(),
+        key=lambda paths: max(getmtime(path) for path in paths),
+        reverse=True
+    )
+
+    removed = []
+    total = 0
+
+    for position, paths in enumerate(ordered):
+        total += sum(entry_size(path) for path in paths)
+
+        if position == 0:
+            continue
+
+        if (max_sessions is not None and position >= max_sessions) or \
+                (max_bytes is not None and total > max_bytes):
+            for path in paths:
+                if isdir(path):
+                    rmtree(path)
+                else:
+                    remove(path)
+            removed.extend(paths)
+
+    if removed and records:
+        removed_names = set(basename(path) for path in removed)
+
+        with open(sessions_path, 'w') as fd:
+            for record in records:
+                if record['entry'] not in removed_names:
+                    fd.write('{}\n'.format(dumps(record)))
+
+    return removed
+
+
+def summarize_boot_profiles(boot_profiles):
+    """
+    Summarize the duration of each boot phase of several nodes.
+
+    :param list boot_profiles: Boot profiles, as found in the ``boot_profile``
+     attribute of the nodes.
+    :rtype: OrderedDict
+    :return: A tuple with the minimum, median and 95th percentile of the
+     seconds spent in each phase.
+    """
+    durations = OrderedDict()
+
+    for boot_profile in boot_profiles:
+        previous = 0
+        for phase, elapsed in boot_profile.items():
+            durations.setdefault(phase, []).append(elapsed - previous)
+            previous = elapsed
+
+    summary = OrderedDict()
+
+    for phase, values in durations.items():
+        values = sorted(values)
+        middle = len(values) // 2
+        median = values[middle] if len(values) % 2 else (
+            values[middle - 1] + values[middle]
+        ) / 2.0
+        summary[phase] = (
+            values[0], median, values[int(ceil(0.95 * len(values))) - 1]
+        )
+
+    return summary
+
+
+__all__ = [
+    'ENTRY_NAME', 'SUMMARY_FILE', 'SESSIONS_FILE', 'item_failed',
+    'write_test_summary', 'record_entry', 'entry_size', 'prune_log_dir',
+    'summarize_boot_profiles'
+]
@@ -22,7 +22,12 @@ OpenSwitch shell module
 from __future__ import unicode_literals, absolute_import
 from __future__ import print_function, division
 
-from topology_docker.shell import DockerShell
+from threading import current_thread, Thread
+
+from topology.platforms.shell import NonExistingConnectionError
+from topology_docker.shell import DockerShell, DockerBashShell
+
+from .cache import CAPABILITIES
 
 from topology_openswitch.vtysh import (
     BASH_FORCED_PROMPT,
@@ -32,7 +37,97 @@ from topology_openswitch.vtysh import (
 )
 
 
-class OpenSwitchVtyshShell(DockerShell, VtyshShellMixin):
+class PrewarmShellMixin(object):
+    """
+    Mixin for shells whose connections can be opened in the background.
+
+    :meth:`prewarm` starts opening a connection in a thread and returns at
+    once. The next call to :meth:`connect`, :meth:`is_connected`,
+    :meth:`send_command` or :meth:`disconnect` for that connection waits for
+    it to be open. If opening it failed, the error is raised by that call, so
+    connection errors are found when the shell is first used and not when it
+    is pre-warmed.
+
+    It must precede the shell class in the bases of the shell.
+    """
+
+    def prewarm(self, connection=None):
+        """
+        Start opening a connection in the background.
+
+        :param str connection: Name of the connection to open.
+        """
+        if not hasattr(self, '_prewarming'):
+            self._prewarming = {}
+
+        errors = []
+
+        def connect():
+            try:
+                super(PrewarmShellMixin, self).connect(connection=connection)
+            except Exception as error:
+                errors.append(error)
+
+        thread = Thread(target=connect)
+        thread.daemon = True
+        self._prewarming[connection] = (thread, errors)
+        thread.start()
+
+    def _wait_prewarm(self, connection=None):
+        prewarming = getattr(self, '_prewarming', {})
+
+        if connection not in prewarming:
+            return
+
+        thread, errors = prewarming[connection]
+
+        # The connection being opened may call these methods itself
+        if thread is current_thread():
+            return
+
+        thread.join()
+        del prewarming[connection]
+
+        if errors:
+            raise errors[0]
+
+    def connect(self, *args, **kwargs):
+        self._wait_prewarm(kwargs.get('connection'))
+        return super(PrewarmShellMixin, self).connect(*args, **kwargs)
+
+    def is_connected(self, connection=None):
+        self._wait_prewarm(connection)
+        return super(PrewarmShellMixin, self).is_connected(
+            connection=connection
+        )
+
+    def send_command(self, *args, **kwargs):
+        self._wait_prewarm(kwargs.get('connection'))
+        return super(PrewarmShellMixin, self).send_command(*args, **kwargs)
+
+    def disconnect(self, *args, **kwargs):
+        self._wait_prewarm(kwargs.get('connection'))
+        return super(PrewarmShellMixin, self).disconnect(*args, **kwargs)
+
+
+class VtyshExitedError(Exception):
+    """
+    Raised when the ``bash`` prompt is found while waiting for the ``vtysh``
+    one, because ``vtysh`` exited, was killed or crashed in a way not
+    recognized as a segmentation fault.
+    """
+
+
+class OpenSwitchBashShell(PrewarmShellMixin, DockerBashShell):
+    """
+    ``bash`` shell of an OpenSwitch node that can be pre-warmed.
+
+    See :class:`PrewarmShellMixin` and
+    :class:`topology_docker.shell.DockerBashShell`.
+    """
+
+
+class OpenSwitchVtyshShell(PrewarmShellMixin, DockerShell, VtyshShellMixin):
     """
     OpenSwitch ``vtysh`` shell
 
@@ -78,10 +173,29 @@ class OpenSwitchVtyshShell(DockerShell, VtyshShellMixin):
     ``vtysh`` shell is exited to the ``bash`` one by sending the ``end``
     command followed by the ``exit`` command.
 
+    If the image of the node is already known to support ``set prompt``, the
+    echo of the ``bash`` shell is disabled before opening ``vtysh`` for the
+    first time and the ``vtysh`` shell is not exited and opened again. The
+    support of each image is kept in
+    :data:`topology_docker_openswitch.cache.CAPABILITIES`.
+
+    The shell can be pre-warmed, see :class:`PrewarmShellMixin`.
+
     :param str container: identifier of the container that holds this shell
+    :param str image_id: identifier of the image of the container, used to
+     cache its support of ``set prompt``
     """
 
-    def __init__(self, container):
+    # Discards the lines written to bash and not yet read
+    DISCARD_TYPEAHEAD = "'while read -r -t 0; do read -r; done'"
+
+    # Maximum number of bytes of commands written at once by send_commands,
+    # all of them may be waiting to be read by vtysh. This keeps the writes of
+    # the commands from blocking when the pty buffers are full of output not
+    # yet read.
+    BATCH_WINDOW = 1024
+
+    def __init__(self, container, image_id=None):
         # The parameter try_filter_echo is disabled by default here to handle
         # images that support the vtysh "set prompt" command and will have its
         # echo disabled since it extends from DockeBashShell. For other
@@ -93,6 +207,17 @@ class OpenSwitchVtyshShell(DockerShell, VtyshShellMixin):
             container, 'bash', '(^|\n).*[#$] ', try_filter_echo=False
         )
 
+        self._image_id = image_id
+
+        # _setup_shell changes the prompt, the initial one is kept to set up
+        # the shell again after a disconnection
+        self._initial_prompt = self._prompt
+
+        # Set by _setup_shell to the result of _determine_set_prompt and to
+        # the vtysh prompt that follows
+        self._forced_prompt = None
+        self._vtysh_prompt = None
+
     def _setup_shell(self, connection=None):
         """
         Get the shell ready to handle ``vtysh`` particularities.
@@ -105,36 +230,58 @@ class OpenSwitchVtyshShell(DockerShell, VtyshShellMixin):
 
         spawn = self._get_connection(connection)
         # Since user, password or initial_command are not being used, this is
-        # the first expect done in the connection. The value of self._prompt at
-        # this moment is the initial prompt of an OpenSwitch bash shell prompt.
-        spawn.expect(self._prompt)
+        # the first expect done in the connection. It is done with the initial
+        # prompt of an OpenSwitch bash shell, self._prompt is changed below.
+        spawn.expect(self._initial_prompt)
 
         # The bash prompt is set to a forced value for vtysh shells that
         # support prompt setting and for the ones that do not.
         spawn.sendline('export PS1={}'.format(BASH_FORCED_PROMPT))
         spawn.expect(BASH_FORCED_PROMPT)
 
+        # Before each one of its prompts, bash discards the lines written to
+        # it and not yet read. If vtysh crashes, the commands that
+        # send_commands wrote after the one that crashed are not run by bash.
+        # This is not exported, so vtysh does not inherit it.
+        spawn.sendline('PROMPT_COMMAND={}'.format(self.DISCARD_TYPEAHEAD))
+        spawn.expect(BASH_FORCED_PROMPT)
+
         def join_prompt(prompt):
             return '{}|{}'.format(BASH_FORCED_PROMPT, prompt)
 
-        if self._determine_set_prompt():
-            # If this image supports "set prompt", then exit back to bash to
-            # set the bash shell without echo.
-            spawn.sendline('exit')
-            spawn.expect(BASH_FORCED_PROMPT)
-
-            # This disables the echo in the bash and in the subsequent vtysh
-            # shell too.
+        if CAPABILITIES.get(self._image_id, 'set_prompt'):
+            # This image is known to support "set prompt", so the echo is
+            # disabled in bash before opening the vtysh shell the first time.
             spawn.sendline('stty -echo')
             spawn.expect(BASH_FORCED_PROMPT)
 
-            # Go into the vtysh shell again. Exiting vtysh after calling "set
-            # prompt" successfully disables the vtysh shell prompt to its
-            # standard value, so it is necessary to call it again.
-            self._determine_set_prompt()
+            self._forced_prompt = self._determine_set_prompt()
+
+        else:
+            self._forced_prompt = self._determine_set_prompt()
 
+            if self._forced_prompt:
+                # If this image supports "set prompt", then exit back to bash
+                # to set the bash shell without echo.
+                spawn.sendline('exit')
+                spawn.expect(BASH_FORCED_PROMPT)
+
+                # This disables the echo in the bash and in the subsequent
+                # vtysh shell too.
+                spawn.sendline('stty -echo')
+                spawn.expect(BASH_FORCED_PROMPT)
+
+                # Go into the vtysh shell again. Exiting vtysh after calling
+                # "set prompt" successfully disables the vtysh shell prompt to
+                # its standard value, so it is necessary to call it again.
+                self._determine_set_prompt()
+
+        CAPABILITIES.set(self._image_id, 'set_prompt', self._forced_prompt)
+
+        if self._forced_prompt:
             # From now on the shell _prompt attribute is set to the defined
             # vtysh forced prompt.
+            self._vtysh_prompt = VTYSH_FORCED_PROMPT
             self._prompt = '|'.join([BASH_FORCED_PROMPT, VTYSH_FORCED_PROMPT])
 
         else:
@@ -145,6 +292,7 @@ class OpenSwitchVtyshShell(DockerShell, VtyshShellMixin):
 
             # From now on the shell _prompt attribute is set to the defined
             # vtysh standard prompt.
+            self._vtysh_prompt = VTYSH_STANDARD_PROMPT
             self._prompt = '|'.join(
                 [BASH_FORCED_PROMPT, VTYSH_STANDARD_PROMPT]
             )
@@ -154,21 +302,150 @@ class OpenSwitchVtyshShell(DockerShell, VtyshShellMixin):
         # connect method.
         spawn.sendline('')
 
+    def _response_matches(self):
+        """
+        Get the matches that end the response of a ``vtysh`` command.
+
+        The ``vtysh`` prompt is the first one, any ``bash`` prompt found
+        before it means that ``vtysh`` is gone, see :meth:`_check_response`.
+        """
+        return [self._vtysh_prompt, BASH_FORCED_PROMPT]
+
+    def _check_response(self, match_index, connection=None):
+        """
+        Raise the proper exception if ``vtysh`` is gone.
+
+        :param int match_index: Index of :meth:`_response_matches` found.
+        :param str connection: Name of the connection of the response.
+        """
+        if match_index != 1:
+            return
+
+        # A segmentation fault is raised with its usual exception, any other
+        # way vtysh ended is raised as an exit.
+        self._handle_crash(connection)
+
+        raise VtyshExitedError(
+            'vtysh exited, the bash prompt was found instead of its one.'
+        )
+
     def send_command(
         self, command, matches=None, newline=True, timeout=None,
         connection=None, silent=False
     ):
-        # This parent method performs the connection to the shell and the set
-        # up of a bash prompt to an unique value.
+        if matches is not None:
+            # This parent method performs the connection to the shell and the
+            # set up of a bash prompt to an unique value.
+            match_index = super(OpenSwitchVtyshShell, self).send_command(
+                command, matches=matches, newline=newline, timeout=timeout,
+                connection=connection, silent=silent
+            )
+
+            # This will raise a proper exception if a crash has been found.
+            self._handle_crash(connection)
+
+            return match_index
+
+        # The vtysh prompt is set up by the connection, so it must be opened
+        # before the prompt is used in the matches.
+        try:
+            if not self.is_connected(connection=connection):
+                self.connect(connection=connection)
+        except NonExistingConnectionError:
+            self.connect(connection=connection)
+
         match_index = super(OpenSwitchVtyshShell, self).send_command(
-            command, matches=matches, newline=newline, timeout=timeout,
-            connection=connection, silent=silent
+            command, matches=self._response_matches(), newline=newline,
+            timeout=timeout, connection=connection, silent=silent
         )
+        self._check_response(match_index, connection)
 
-        # This will raise a proper exception if a crash has been found.
-        self._handle_crash(connection)
-
-        return match_index
+        return 0
 
+    def send_commands(
+        self, commands, timeout=None, connection=None, silent=False
+    ):
+        """
+        Send several commands and get the response of each one of them.
+
+        The commands are written to the shell without waiting for the
+        response of the previous ones, in windows of up to
+        :attr:`BATCH_WINDOW` bytes written at once. The forced ``vtysh``
+        prompt that follows the output of each command is then used to split
+        the output in the response of each one of them.
+
+        If ``vtysh`` crashes or exits, it is raised at once, see
+        :meth:`_check_response`, and no more windows are written. The
+        commands of the window of the crash that follow the one that crashed
+        have already been written, but ``bash`` discards them before showing
+        its prompt, so they are not executed.
+
+        This needs an image that supports the ``vtysh`` ``set prompt``
+        command, with other images the commands are sent one after the other
+        with :meth:`send_command`.
+
+        :param list commands: Commands to send.
+        :param int timeout: Seconds to wait for the response of each command.
+        :param str connection: Name of the connection to use.
+        :param bool silent: True to not log the responses.
+        :rtype: list
+        :return: The response of each command.
+        """
+        try:
+            if not self.is_connected(connection=connection):
+                self.connect(connection=connection)
+        except NonExistingConnectionError:
+            self.connect(connection=connection)
+
+        if not self._forced_prompt:
+            responses = []
+            for command in commands:
+                self.send_command(
+                    command, timeout=timeout, connection=connection,
+                    silent=silent
+                )
+                responses.append(
+                    self.get_response(connection=connection, silent=silent)
+                )
+            return responses
+
+        if timeout is None:
+            timeout = self._timeout
 
-__all__ = ['OpenSwitchVtyshShell']
+        spawn = self._get_connection(connection)
+        commands = list(commands)
+        responses = []
+
+        while commands:
+            # The commands are written in windows of up to BATCH_WINDOW bytes,
+            # each one with a single write, and the responses of a window are
+            # read before the next one is written.
+            window = [commands.pop(0)]
+            window_bytes = len(window[0]) + 1
+
+            while commands and (
+                window_bytes + len(commands[0]) + 1 <= self.BATCH_WINDOW
+            ):
+                window_bytes += len(commands[0]) + 1
+                window.append(commands.pop(0))
+
+            spawn.send('\n'.join(window) + '\n')
+
+            for command in window:
+                match_index = spawn.expect(
+                    self._response_matches(), timeout=timeout
+                )
+                self._last_command = command
+                self._check_response(match_index, connection)
+
+                responses.append(
+                    self.get_response(connection=connection, silent=silent)
+                )
+
+        return responses
+
+
+__all__ = [
+    'PrewarmShellMixin', 'VtyshExitedError', 'OpenSwitchBashShell',
+    'OpenSwitchVtyshShell'
+]
@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2016 Hewlett Packard Enterprise Development LP
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""
+Test suite for module topology_docker_openswitch.agent.
+"""
+
+from __future__ import unicode_literals, absolute_import
+from __future__ import print_function, division
+
+from os.path import exists
+from socket import AF_UNIX, SOCK_STREAM, socket
+from threading import Thread
+from time import sleep, time
+
+from pytest import fixture, raises
+
+from topology_docker_openswitch.agent import Agent, AgentClient
+from topology_docker_openswitch.ovsdb import OvsdbError, OvsdbTimeout
+
+
+@fixture
+def agent_client(tmpdir):
+    socket_path = str(tmpdir.join('agent.sock'))
+    agent = Agent(socket_path, db_sock=str(tmpdir.join('missing.sock')))
+
+    thread = Thread(target=agent.serve_forever)
+    thread.daemon = True
+    thread.start()
+
+    while not exists(socket_path):
+        sleep(0.01)
+
+    client = AgentClient.connect_unix(socket_path)
+
+    yield client
+
+    client.close()
+    agent.shutdown()
+    thread.join()
+
+
+def test_agent_requests(agent_client):
+    """
+    Check the run request of the agent.
+    """
+    result = agent_client.run(['sh', '-c', 'echo out; echo err >&2; exit 3'])
+
+    assert result == {
+        'returncode': 3, 'output': 'out\n', 'error_output': 'err\n'
+    }
+    assert agent_client.run(['cat'], input='text')['output'] == 'text'
+    assert agent_client.run(['sleep', '5'], timeout=0.1)['returncode'] != 0
+
+
+def test_agent_errors(agent_client):
+    """
+    Check that failed and unknown requests are answered with errors.
+    """
+    with raises(OvsdbError):
+        agent_client.run(['/nonexistent/command'])
+
+    with raises(OvsdbError):
+        agent_client.call('format', [])
+
+    with raises(OvsdbError):
+        agent_client.transact('OpenSwitch', [])
+
+    assert agent_client.run(['true'])['returncode'] == 0
+
+
+def test_agent_transact_timeout(tmpdir):
+    """
+    Check that the agent gives up a transaction that is not answered.
+    """
+    # The OVSDB server accepts the connection but never answers
+    db_sock = socket(AF_UNIX, SOCK_STREAM)
+    db_sock.bind(str(tmpdir.join('db.sock')))
+    db_sock.listen(1)
+
+    agent = Agent(
+        str(tmpdir.join('agent.sock')), db_sock=str(tmpdir.join('db.sock'))
+    )
+
+    start = time()
+
+    with raises(OvsdbTimeout):
+        agent.do_transact('OpenSwitch', 0.2)
+
+    assert time() - start < 5
+    assert agent._ovsdb_client is None
+
+    db_sock.close()
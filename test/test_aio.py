@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2016 Hewlett Packard Enterprise Development LP
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""
+Test suite for module topology_docker_openswitch.aio.
+
+The commands block on FIFOs instead of sleeping, so the order in which they
+finish is known.
+"""
+
+from __future__ import unicode_literals, absolute_import
+from __future__ import print_function, division
+
+from os import mkfifo
+from sys import version_info
+from threading import Thread
+
+from pexpect import TIMEOUT
+from pytest import fixture, importorskip, mark, raises
+
+from topology.platforms.shell import PExpectShell
+
+from topology_docker_openswitch.aio import async_send_command
+
+
+pytestmark = mark.skipif(
+    version_info < (3, 5), reason='The asyncio interface needs Python 3.5'
+)
+
+PROMPT = '@~~==::TEST_PROMPT::==~~@'
+
+
+class LocalShell(PExpectShell):
+    """
+    Shell that runs sh locally with a known prompt.
+    """
+
+    def __init__(self):
+        super(LocalShell, self).__init__(
+            PROMPT, initial_command='PS1={}; stty -echo'.format(PROMPT),
+            timeout=5
+        )
+
+    def _get_connect_command(self):
+        return 'env PS1={} sh'.format(PROMPT)
+
+
+@fixture
+def loop():
+    from asyncio import new_event_loop, set_event_loop
+
+    loop = new_event_loop()
+    set_event_loop(loop)
+
+    yield loop
+
+    loop.close()
+    set_event_loop(None)
+
+
+def write_fifo(path, text):
+    # Opening a FIFO blocks until it is opened for reading too
+    def write():
+        with open(path, 'w') as fd:
+            fd.write(text)
+
+    thread = Thread(target=write)
+    thread.daemon = True
+    thread.start()
+
+    return thread
+
+
+def test_async_send_command(tmpdir, loop):
+    """
+    Check that a shell waiting for its response does not block the others.
+    """
+    fifo = str(tmpdir.join('fifo'))
+    mkfifo(fifo)
+
+    shells = [LocalShell(), LocalShell()]
+
+    blocked = async_send_command(
+        shells[0], 'read line < {}; echo "$line"'.format(fifo), silent=True
+    )
+    answered = async_send_command(shells[1], 'echo answered', silent=True)
+
+    assert loop.run_until_complete(answered) == 'answered'
+    assert not blocked.done()
+
+    writer = write_fifo(fifo, 'released\n')
+
+    assert loop.run_until_complete(blocked) == 'released'
+
+    writer.join()
+
+    # The commands of a connection are sent one at a time
+    first = async_send_command(
+        shells[0], 'read line < {}; echo "$line"'.format(fifo), silent=True
+    )
+    second = async_send_command(shells[0], 'echo second', silent=True)
+
+    writer = write_fifo(fifo, 'first\n')
+
+    assert loop.run_until_complete(second) == 'second'
+    assert first.result() == 'first'
+
+    writer.join()
+
+    for shell in shells:
+        shell.disconnect()
+
+
+def test_async_send_command_timeout(tmpdir, loop):
+    """
+    Check the timeout of a command and that the blocking interface can use
+    the connection afterwards.
+    """
+    fifo = str(tmpdir.join('fifo'))
+    mkfifo(fifo)
+
+    shell = LocalShell()
+
+    with raises(TIMEOUT):
+        loop.run_until_complete(async_send_command(
+            shell, 'read line < {}'.format(fifo), timeout=0.1, silent=True
+        ))
+
+    write_fifo(fifo, 'released\n').join()
+
+    # The blocking interface finds the connection as it expects it
+    shell._get_connection().expect(PROMPT)
+    shell.send_command('echo blocking', silent=True)
+    assert shell.get_response(silent=True) == 'blocking'
+
+    shell.disconnect()
+
+
+def test_async_send_command_vtysh_exit(loop):
+    """
+    Check that vtysh exiting is raised as by the blocking interface.
+    """
+    importorskip('topology_openswitch.vtysh')
+
+    from topology_docker_openswitch.shell import VtyshExitedError
+    from .test_shell import LocalVtyshShell
+
+    shell = LocalVtyshShell()
+
+    assert loop.run_until_complete(
+        async_send_command(shell, 'echo vtysh', silent=True)
+    ) == 'vtysh'
+
+    with raises(VtyshExitedError):
+        loop.run_until_complete(
+            async_send_command(shell, 'exit', silent=True)
+        )
+
+    shell.disconnect()
@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2016 Hewlett Packard Enterprise Development LP
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""
+Test suite for module topology_docker_openswitch.pytest.archive.
+"""
+
+from __future__ import unicode_literals, absolute_import
+from __future__ import print_function, division
+
+from tarfile import open as tar_open
+
+from topology_docker_openswitch.pytest.archive import ArtifactArchiver
+
+
+def test_archiver_deduplicates(tmpdir):
+    """
+    Check that files already archived are listed in the manifest instead of
+    being stored again, and that the size limit is honored.
+    """
+    node = tmpdir.mkdir('node')
+    node.join('openswitch_setup').write('script')
+    node.join('container_logs').write('first test')
+
+    archiver = ArtifactArchiver(compresslevel=1, max_bytes=20)
+    first = str(tmpdir.join('first.tar.gz'))
+
+    assert archiver.archive(first, {'node': str(node)}) == []
+
+    with tar_open(first) as tar:
+        assert sorted(tar.getnames()) == [
+            'node/container_logs', 'node/openswitch_setup'
+        ]
+
+    node.join('container_logs').write('second test')
+    node.join('core').write('x' * 30)
+    second = str(tmpdir.join('second.tar.gz'))
+
+    warnings = archiver.archive(second, {'node': str(node)})
+
+    assert len(warnings) == 1
+
+    with tar_open(second) as tar:
+        assert sorted(tar.getnames()) == ['MANIFEST', 'node/container_logs']
+        manifest = tar.extractfile('MANIFEST').read().decode('utf-8')
+
+    lines = manifest.splitlines()
+
+    assert lines[0].startswith('node/core ')
+    # The logs of the second test already took 11 of the 20 bytes
+    assert lines[0].endswith(
+        'skipped, file of 30 bytes would be 21 bytes over the limit of 20'
+    )
+    assert lines[1].startswith('node/openswitch_setup ')
+    assert lines[1].endswith('duplicate of first.tar.gz:node/openswitch_setup')
@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2016 Hewlett Packard Enterprise Development LP
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""
+Test suite for module topology_docker_openswitch.cache.
+"""
+
+from __future__ import unicode_literals, absolute_import
+from __future__ import print_function, division
+
+from topology_docker_openswitch.cache import CapabilityCache
+
+
+def test_capability_cache(tmpdir):
+    """
+    Check that capabilities are kept per image and persisted in the cache
+    directory.
+    """
+    cache_dir = str(tmpdir.join('cache'))
+    image_id = 'sha256:0123456789abcdef'
+
+    cache = CapabilityCache(cache_dir)
+    cache.set(image_id, 'set_prompt', True)
+    cache.set(image_id, 'hwports', ['1', '2'])
+    cache.set(None, 'set_prompt', False)
+
+    assert cache.get(image_id, 'set_prompt') is True
+    assert cache.get('sha256:other', 'set_prompt') is None
+    assert cache.get(None, 'set_prompt', 'default') == 'default'
+
+    reloaded = CapabilityCache(cache_dir)
+
+    assert reloaded.get(image_id, 'hwports') == ['1', '2']
+    assert CapabilityCache().get(image_id, 'hwports') is None
@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2016 Hewlett Packard Enterprise Development LP
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""
+Test suite for module topology_docker_openswitch.pytest.collect.
+"""
+
+from __future__ import unicode_literals, absolute_import
+from __future__ import print_function, division
+
+from os.path import basename
+from shlex import split as shsplit
+from subprocess import check_output
+from tarfile import open as open_tar
+from time import time
+
+from pytest import raises
+
+from topology_docker_openswitch.parallel import TaskTimeout
+from topology_docker_openswitch.pytest.collect import (
+    LOG_OFFSETS, collect_new_log_bytes, skip_new_log_bytes,
+    collect_new_cores, collect_node_artifacts
+)
+
+
+class FakeNode(object):
+    """
+    Node whose commands are run locally.
+    """
+
+    def __init__(self, identifier):
+        self.identifier = identifier
+        self.container_id = identifier
+
+    def _exec(self, command):
+        return check_output(shsplit(command)).decode('utf-8')
+
+
+class HungNode(FakeNode):
+    """
+    Node whose commands hang, until the timeout they are given kills them.
+    """
+
+    def __init__(self, identifier, shared_dir):
+        super(HungNode, self).__init__(identifier)
+        self.shared_dir = shared_dir
+        self.shared_dir_mount = shared_dir
+        self.commands = []
+
+    def _exec(self, command):
+        self.commands.append(command)
+        return check_output(shsplit(command)[:2] + ['sleep', '30'])
+
+
+def test_collect_new_log_bytes(tmpdir):
+    """
+    Check that only the bytes written since the previous collection or skip
+    are collected.
+    """
+    node = FakeNode('collect_log_bytes')
+    messages = tmpdir.join('messages')
+    collected = tmpdir.join('collected')
+
+    messages.write('first\n')
+    collect_new_log_bytes(node, str(messages), str(collected))
+
+    # A passed test in failed only mode skips its logs
+    messages.write('second\n', mode='a')
+    skip_new_log_bytes(node, str(messages))
+
+    messages.write('third\n', mode='a')
+    collect_new_log_bytes(node, str(messages), str(collected))
+
+    assert collected.read().splitlines() == [
+        'Output of: {} from byte 0'.format(messages),
+        'first',
+        '',
+        'Output of: {} from byte 13'.format(messages),
+        'third',
+        ''
+    ]
+    assert LOG_OFFSETS[node.container_id][1] == 19
+
+    # A rotated file is collected from its beginning
+    collected.remove()
+    messages.remove()
+    messages.write('rotated\n')
+    collect_new_log_bytes(node, str(messages), str(collected))
+
+    assert collected.read().splitlines() == [
+        'Output of: {} from byte 0'.format(messages), 'rotated', ''
+    ]
+
+
+def test_collect_new_cores(tmpdir):
+    """
+    Check that only new coredumps are collected, compressed, and that the
+    ones over the limit are left to the next collection.
+    """
+    node = FakeNode('collect_cores')
+    cores = tmpdir.mkdir('coredump')
+
+    for name, size in (('core.1', 10), ('core.2', 30), ('core.3', 20)):
+        cores.join(name).write('x' * size)
+
+    def collected_names(tarball):
+        with open_tar(str(tarball), 'r:gz') as tar:
+            return sorted(basename(member) for member in tar.getnames())
+
+    first = tmpdir.join('first.tar.gz')
+    warnings = collect_new_cores(node, str(cores), str(first), max_bytes=35)
+
+    assert collected_names(first) == ['core.1', 'core.3']
+    assert warnings == [
+        'Coredump {} of node collect_cores not collected, it would be over '
+        '35 bytes.'.format(cores.join('core.2'))
+    ]
+
+    second = tmpdir.join('second.tar.gz')
+    assert collect_new_cores(node, str(cores), str(second)) == []
+    assert collected_names(second) == ['core.2']
+
+    # Nothing is written when there are no new coredumps
+    third = tmpdir.join('third.tar.gz')
+    assert collect_new_cores(node, str(cores), str(third)) == []
+    assert not third.check()
+
+
+def test_collect_node_artifacts_timeout(tmpdir):
+    """
+    Check that a collection stops once its time is over and does not copy
+    the shared folder afterwards.
+    """
+    node = HungNode('collect_hung', str(tmpdir.mkdir('shared')))
+    path_name = tmpdir.join('test_artifacts')
+
+    start = time()
+
+    with raises(TaskTimeout):
+        collect_node_artifacts(node, str(path_name), timeout=1)
+
+    assert time() - start < 10
+    assert all(command.startswith('timeout ') for command in node.commands)
+    assert not path_name.check()
@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2016 Hewlett Packard Enterprise Development LP
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""
+Test suite for module topology_docker_openswitch.fanout.
+"""
+
+from __future__ import unicode_literals, absolute_import
+from __future__ import print_function, division
+
+from time import sleep, time
+
+from topology_docker_openswitch.fanout import fan_out, openswitch_nodes
+
+
+class FakeNode(object):
+
+    def __init__(self, identifier, node_type='openswitch'):
+        self.identifier = identifier
+        self.metadata = {'type': node_type}
+        self.executed = []
+
+    def send_command(self, command, shell=None):
+        if command == 'fail':
+            raise Exception('{} failed'.format(self.identifier))
+        sleep(0.2)
+        return '{} {} {}'.format(self.identifier, shell, command)
+
+    def get_shell(self, shell):
+        if shell == 'vtysh':
+            return FakeVtyshShell(self)
+        return object()
+
+
+class FakeVtyshShell(object):
+    """
+    vtysh shell whose vtysh crashes with the command crash_on of its node.
+    """
+
+    def __init__(self, node):
+        self.node = node
+
+    def send_commands(self, commands):
+        responses = []
+
+        for command in commands:
+            if command == getattr(self.node, 'crash_on', None):
+                raise Exception('{} crashed'.format(self.node.identifier))
+
+            self.node.executed.append(command)
+            responses.append('{} {}'.format(self.node.identifier, command))
+
+        return responses
+
+
+class FakeTopology(object):
+
+    def __init__(self, nodes):
+        self._nodes = dict((node.identifier, node) for node in nodes)
+        self.nodes = [node.identifier for node in nodes]
+
+    def get(self, identifier):
+        return self._nodes[identifier]
+
+
+def test_fan_out():
+    """
+    Check that commands are sent to the selected nodes at the same time.
+    """
+    topology = FakeTopology([
+        FakeNode('ops1'), FakeNode('hs1', 'host'), FakeNode('ops2'),
+        FakeNode('ops3')
+    ])
+
+    nodes = openswitch_nodes(topology)
+
+    assert [node.identifier for node in nodes] == ['ops1', 'ops2', 'ops3']
+    assert [
+        node.identifier for node in openswitch_nodes(topology, ['ops3', 'hs1'])
+    ] == ['ops3']
+
+    start = time()
+    results = fan_out(nodes, 'show version', workers=3)
+
+    assert time() - start < 0.5
+    assert list(results.keys()) == ['ops1', 'ops2', 'ops3']
+    assert results['ops2'].value == 'ops2 vtysh show version'
+    assert results['ops2'].error is None
+    assert results['ops2'].elapsed >= 0.2
+
+    results = fan_out(nodes[:1], ['ip -s link', 'fail'], shell='bash')
+
+    assert str(results['ops1'].error) == 'ops1 failed'
+
+
+def test_fan_out_crash():
+    """
+    Check that a crash stops the commands of its node only.
+    """
+    nodes = [FakeNode('ops1'), FakeNode('ops2')]
+    nodes[0].crash_on = 'show vlan'
+
+    results = fan_out(nodes, ['show version', 'show vlan', 'show run'])
+
+    assert str(results['ops1'].error) == 'ops1 crashed'
+    assert nodes[0].executed == ['show version']
+
+    assert results['ops2'].error is None
+    assert results['ops2'].value == [
+        'ops2 show version', 'ops2 show vlan', 'ops2 show run'
+    ]
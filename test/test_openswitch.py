@@ -0,0 +1,305 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2016 Hewlett Packard Enterprise Development LP
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""
+Test suite for module topology_docker_openswitch.openswitch.
+
+The nodes are created without a container, with the attributes set by their
+setup, and their commands are run locally.
+"""
+
+from __future__ import unicode_literals, absolute_import
+from __future__ import print_function, division
+
+from collections import OrderedDict
+from json import dumps
+from os import environ
+from shlex import split as shsplit
+from subprocess import CalledProcessError, check_output
+from threading import Lock
+
+from pytest import importorskip, raises
+
+importorskip('topology_openswitch.openswitch')
+
+from topology_docker_openswitch import openswitch  # noqa
+from topology_docker_openswitch.ovsdb import OvsdbTimeout  # noqa
+
+
+def local_exec(command):
+    return check_output(shsplit(command)).decode('utf-8')
+
+
+def create_node(tmpdir, **attributes):
+    """
+    Create a node as left by its setup, without a container.
+    """
+    node = openswitch.OpenSwitch.__new__(openswitch.OpenSwitch)
+    node.identifier = 'ops1'
+    node._container_id = 'ops1'
+    node._shared_dir = str(tmpdir.join('shared'))
+    node._shared_dir_mount = str(tmpdir.join('mount'))
+    node._agent = None
+    node._agent_lock = Lock()
+    node._port_mapping = {}
+    node._mapped_ports_netns = 'swns'
+    node._ports_netns = {}
+    node._exec = local_exec
+    node._docker_exec = local_exec
+
+    for name, value in attributes.items():
+        setattr(node, name, value)
+
+    return node
+
+
+def test_refresh_ports_without_shared_dir(tmpdir):
+    """
+    Check that the ports are refreshed from the mapping kept at setup.
+    """
+    node = create_node(
+        tmpdir,
+        ports={'1': 'eth1', '2': 'eth2'},
+        _port_mapping={'1': '1'},
+        _mapped_ports_netns='emulns'
+    )
+
+    assert not tmpdir.join('shared').check()
+
+    node.refresh_ports()
+
+    assert node.ports == {'1': '1', '2': 'eth2'}
+    assert node._ports_netns == {'1': 'emulns', '2': None}
+
+
+def test_refresh_ports_reread(tmpdir):
+    """
+    Check that the setup result is read again from the container.
+    """
+    node = create_node(tmpdir, ports={'1': 'eth1', '2': 'eth2'})
+    mount = tmpdir.mkdir('mount')
+
+    mount.join('setup_result.json').write(dumps({
+        'netns': 'emulns', 'port_mapping': {'1': '1', '2': '2'}
+    }))
+    node.refresh_ports(reread=True)
+
+    assert node._ports_netns == {'1': 'emulns', '2': 'emulns'}
+
+    # Custom setup scripts may only write the port mapping
+    mount.join('setup_result.json').remove()
+    mount.join('port_mapping.json').write(dumps({'1': '1'}))
+    node.refresh_ports(reread=True)
+
+    assert node._port_mapping == {'1': '1'}
+    assert node._ports_netns == {'1': 'swns', '2': None}
+
+
+class TimingOutAgent(object):
+
+    def __init__(self):
+        self.timeouts = []
+        self.closed = False
+
+    def run(self, command, timeout=None):
+        self.timeouts.append(timeout)
+        raise OvsdbTimeout('No response after {} seconds.'.format(timeout))
+
+    def close(self):
+        self.closed = True
+
+
+def test_agent_timeout(tmpdir):
+    """
+    Check that an agent that times out is raised and not used anymore.
+    """
+    agent = TimingOutAgent()
+    node = create_node(tmpdir, _agent=agent)
+    del node._exec
+
+    with raises(CalledProcessError):
+        node._exec('true')
+
+    assert agent.timeouts == [openswitch.AGENT_TIMEOUT]
+    assert agent.closed
+    assert node._agent is None
+
+    # The next commands fall back to docker exec
+    assert node._exec('echo hello') == 'hello\n'
+
+
+def test_log_commands(tmpdir):
+    """
+    Check the output logged for each command, including one that times out.
+    """
+    location = tmpdir.join('logs')
+    run = []
+
+    def function(command, **kwargs):
+        run.append(command)
+        return check_output(command, **kwargs)
+
+    openswitch.log_commands(
+        ['echo "it\'s $HOME"', 'sleep 5', 'exit 3'], str(location), function,
+        escape=False, timeout=1, shell=True
+    )
+
+    # All the commands are run with a single call
+    assert len(run) == 1
+    assert location.read().splitlines() == [
+        'Output of: echo "it\'s $HOME"',
+        'it\'s {}'.format(environ['HOME']),
+        'Exit code: 0',
+        '',
+        'Output of: sleep 5',
+        'Exit code: 124',
+        '',
+        'Output of: exit 3',
+        'Exit code: 3',
+        ''
+    ]
+
+
+def test_set_ports_state(tmpdir):
+    """
+    Check that the ports of each namespace are set with a single ip -batch
+    in one docker exec.
+    """
+    commands = []
+    node = create_node(
+        tmpdir,
+        ports={'1': '1', '2': '2', '3': 'eth3'},
+        _ports_netns={'1': 'swns', '2': 'swns', '3': None},
+        _docker_exec=commands.append
+    )
+
+    node.set_ports_state(
+        OrderedDict([('1', True), ('3', False), ('2', False)])
+    )
+
+    assert commands == [
+        'sh -c "'
+        'printf \'link set dev 1 up\\nlink set dev 2 down\\n\' | '
+        'ip netns exec swns ip -batch - && '
+        'printf \'link set dev eth3 down\\n\' | ip -batch -'
+        '"'
+    ]
+
+    # A port that is not mapped stays in the default namespace
+    del commands[:]
+    node._port_mapping = {'1': '1'}
+    node._mapped_ports_netns = 'emulns'
+    node.refresh_ports()
+    node.set_ports_state({'2': True})
+
+    assert commands == [
+        'sh -c "printf \'link set dev 2 up\\n\' | ip -batch -"'
+    ]
+
+    with raises(KeyError):
+        node.set_ports_state({'4': True})
+
+
+class LinksAgent(object):
+
+    def __init__(self):
+        self.links = []
+
+    def set_links(self, links, timeout=None):
+        self.links.append(links)
+        return len(links)
+
+
+def test_set_ports_state_agent(tmpdir):
+    """
+    Check that the agent gets the namespace of each port.
+    """
+    agent = LinksAgent()
+    node = create_node(
+        tmpdir,
+        ports={'1': '1', '2': 'eth2'},
+        _ports_netns={'1': 'emulns', '2': None},
+        _agent=agent
+    )
+
+    node.set_ports_state(OrderedDict([('1', True), ('2', False)]))
+
+    assert agent.links == [[['emulns', '1', True], [None, 'eth2', False]]]
+
+
+def test_setup_failure_post_mortem(tmpdir, monkeypatch):
+    """
+    Check that the post-mortem of a failed setup leaves out the logs already
+    in the streamed boot journal.
+    """
+    logged = []
+    stopped = []
+
+    def failing_setup(command):
+        raise CalledProcessError(1, command)
+
+    def record_commands(commands, location, function, **kwargs):
+        logged.append((location, commands))
+
+    monkeypatch.setattr(openswitch, 'log_commands', record_commands)
+    monkeypatch.setattr(openswitch, 'system', lambda: 'Linux')
+    monkeypatch.setattr(
+        openswitch, 'linux_distribution', lambda: ('debian', '8', '')
+    )
+    monkeypatch.setattr(openswitch, 'LOG_PATHS', [])
+    monkeypatch.setattr(openswitch.CAPABILITIES, 'get', lambda *args: None)
+
+    tmpdir.mkdir('shared')
+    node = create_node(
+        tmpdir,
+        _image_id='image',
+        _docker_exec=failing_setup,
+        _stream_journal=lambda path: 'journal',
+        _stop_journal=stopped.append
+    )
+
+    monkeypatch.setattr(openswitch, 'STREAM_BOOT_JOURNAL', True)
+
+    with raises(CalledProcessError):
+        node._setup_system()
+
+    assert stopped == ['journal']
+    assert logged[0] == (
+        '{}/container_logs'.format(node.shared_dir_mount),
+        [
+            'ovs-vsctl list Daemon',
+            'coredumpctl gdb',
+            'ps -aef',
+            'systemctl --state=failed --all',
+            'ovsdb-client dump'
+        ]
+    )
+    assert logged[1][0] == '{}/execution_machine_logs'.format(
+        node.shared_dir
+    )
+    assert openswitch.LOG_PATHS == [node.shared_dir]
+
+    # Without the journal the service logs are dumped too
+    del logged[:]
+    monkeypatch.setattr(openswitch, 'STREAM_BOOT_JOURNAL', False)
+
+    with raises(CalledProcessError):
+        node._setup_system()
+
+    assert stopped == ['journal']
+    assert 'cat /var/log/messages' in logged[0][1]
+    assert 'systemctl status switchd -n 10000 -l' in logged[0][1]
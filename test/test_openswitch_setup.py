@@ -0,0 +1,263 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2016 Hewlett Packard Enterprise Development LP
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""
+Test suite for the openswitch_setup script.
+
+The script is meant to be executed inside an OpenSwitch container, these tests
+load it as a module and exercise its parts against local fakes.
+"""
+
+from __future__ import unicode_literals, absolute_import
+from __future__ import print_function, division
+
+from json import dumps, loads
+from os.path import join, dirname, abspath
+from socket import AF_UNIX, SOCK_STREAM, socket
+from threading import Thread
+from time import sleep
+
+from pytest import fixture
+
+
+SETUP_SCRIPT = join(
+    dirname(abspath(__file__)), '..', 'lib', 'topology_docker_openswitch',
+    'openswitch_setup'
+)
+FIXTURES = join(dirname(abspath(__file__)), 'fixtures')
+
+
+def load_setup_script():
+    try:
+        from importlib.machinery import SourceFileLoader
+        from importlib.util import spec_from_loader, module_from_spec
+    except ImportError:
+        from imp import load_source
+        return load_source('openswitch_setup', SETUP_SCRIPT)
+
+    loader = SourceFileLoader('openswitch_setup', SETUP_SCRIPT)
+    module = module_from_spec(spec_from_loader('openswitch_setup', loader))
+    loader.exec_module(module)
+    return module
+
+
+@fixture
+def setup_script():
+    return load_setup_script()
+
+
+class FakeOvsdbServer(object):
+    """
+    Minimal OVSDB JSON-RPC server listening on an unix socket.
+
+    It answers a single monitor request with the initial System row and then
+    sends each one of the given updates, split in two writes to exercise the
+    buffering of partial messages.
+    """
+
+    def __init__(self, path, initial, updates):
+        self.path = path
+        self.initial = initial
+        self.updates = updates
+        self.requests = []
+        self.server = socket(AF_UNIX, SOCK_STREAM)
+        self.server.bind(path)
+        self.server.listen(1)
+        self.thread = Thread(target=self._serve)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def _serve(self):
+        connection, _ = self.server.accept()
+        request = loads(connection.recv(4096).decode('utf-8'))
+        self.requests.append(request)
+
+        connection.sendall(dumps({
+            'id': request['id'], 'error': None,
+            'result': {'System': {'uuid': {'new': self.initial}}}
+        }).encode('utf-8'))
+
+        for update in self.updates:
+            sleep(0.05)
+            message = dumps({
+                'id': None, 'method': 'update',
+                'params': [None, {'System': {'uuid': {'new': update}}}]
+            }).encode('utf-8')
+            connection.sendall(message[:10])
+            sleep(0.01)
+            connection.sendall(message[10:])
+
+        self.connection = connection
+
+
+def test_cur_is_set_monitor(setup_script, tmpdir):
+    """
+    Check that cur_is_set returns once the monitor update arrives.
+    """
+    path = str(tmpdir.join('db.sock'))
+    server = FakeOvsdbServer(
+        path, {'cur_hw': 0, 'cur_cfg': 0},
+        [{'cur_hw': 1, 'cur_cfg': 0}, {'cur_hw': 1, 'cur_cfg': 1}]
+    )
+    setup_script.db_sock = path
+
+    assert setup_script.cur_is_set('cur_hw', 5)
+    assert setup_script.cur_is_set('cur_cfg', 5)
+
+    assert len(server.requests) == 1
+    assert server.requests[0]['method'] == 'monitor'
+
+
+def test_cur_is_set_timeout(setup_script, tmpdir):
+    """
+    Check that cur_is_set gives up when the column is never set.
+    """
+    path = str(tmpdir.join('db.sock'))
+    server = FakeOvsdbServer(path, {'cur_hw': 0, 'cur_cfg': 0}, [])
+    setup_script.db_sock = path
+
+    assert not setup_script.cur_is_set('cur_hw', 0.3)
+    assert server.requests
+
+
+def test_plan_interfaces_swns(setup_script):
+    """
+    Check the port plan of an image without the P4 simulator.
+    """
+    hwports = setup_script.read_hwports(join(FIXTURES, 'ports.yaml'))
+    assert hwports == ['1', '2', '3', '4', '49']
+
+    mapping_ports, batches = setup_script.plan_interfaces(
+        hwports, ['bonding_masters', 'eth0', 'lo', 'oobm', 'if01', 'if02'],
+        ['lo', '3'], 'swns'
+    )
+
+    assert list(mapping_ports.items()) == [('if01', '1'), ('if02', '2')]
+    assert batches[None] == [
+        'link set if01 name 1',
+        'link set 1 netns swns',
+        'link set if02 name 2',
+        'link set 2 netns swns',
+        'tuntap add dev 4 mode tap',
+        'link set 4 netns swns',
+        'tuntap add dev 49 mode tap',
+        'link set 49 netns swns'
+    ]
+    assert batches['swns'] == []
+
+
+def test_plan_interfaces_emulns(setup_script):
+    """
+    Check the port plan of an image with the P4 simulator.
+    """
+    hwports = setup_script.read_hwports(join(FIXTURES, 'ports.yaml'))
+
+    mapping_ports, batches = setup_script.plan_interfaces(
+        hwports, ['eth0', 'lo', 'if01'], ['lo'], 'emulns'
+    )
+
+    assert list(mapping_ports.items()) == [('if01', '1')]
+    assert batches[None] == [
+        'link set if01 name 1',
+        'link set 1 netns emulns'
+    ]
+    assert batches['emulns'] == ['link set dev 1 up']
+
+
+def test_split_runtime_cli_output(setup_script):
+    """
+    Check that a runtime_CLI session output is split per command.
+    """
+    output = (
+        'Obtaining JSON from switch...\n'
+        'Done\n'
+        'Control utility for runtime P4 table manipulation\n'
+        'RuntimeCmd: \n'
+        'RuntimeCmd: Error: port 2 already exists\n'
+        'RuntimeCmd: \n'
+        'RuntimeCmd: '
+    )
+
+    assert setup_script.split_runtime_cli_output(output, 3) == [
+        '', 'Error: port 2 already exists', ''
+    ]
+    assert setup_script.split_runtime_cli_output(output, 5) == [
+        '', 'Error: port 2 already exists', '', None, None
+    ]
+
+
+IP_LINK_DOWN = (
+    '1: lo: <LOOPBACK> mtu 65536 qdisc noop state DOWN mode DEFAULT '
+    'group default qlen 1\\    link/loopback 00:00:00:00:00:00 brd '
+    '00:00:00:00:00:00\n'
+    '7: 1@if6: <BROADCAST,MULTICAST,UP,LOWER_UP> mtu 1500 qdisc noqueue '
+    'state UP mode DEFAULT group default qlen 1000\\    link/ether '
+    '4a:1e:0c:31:8a:21 brd ff:ff:ff:ff:ff:ff link-netnsid 0\n'
+    '9: 2@if8: <BROADCAST,MULTICAST> mtu 1500 qdisc noop state DOWN mode '
+    'DEFAULT group default qlen 1000\\    link/ether 6e:9d:3a:02:43:10 brd '
+    'ff:ff:ff:ff:ff:ff link-netnsid 0\n'
+)
+IP_LINK_UP = IP_LINK_DOWN.replace(
+    '2@if8: <BROADCAST,MULTICAST>', '2@if8: <BROADCAST,MULTICAST,UP>'
+)
+
+
+def test_parse_link_flags(setup_script):
+    """
+    Check that the flags of each interface are parsed from ip -o link.
+    """
+    links = setup_script.parse_link_flags(IP_LINK_DOWN)
+
+    assert links['lo'] == ['LOOPBACK']
+    assert links['1'] == ['BROADCAST', 'MULTICAST', 'UP', 'LOWER_UP']
+    assert links['2'] == ['BROADCAST', 'MULTICAST']
+
+
+def test_wait_links_up(setup_script, monkeypatch):
+    """
+    Check that all the interfaces are checked with a single ip call per
+    iteration until all of them are UP.
+    """
+    outputs = [IP_LINK_DOWN, IP_LINK_DOWN, IP_LINK_UP]
+    commands = []
+
+    def check_output(command):
+        commands.append(command)
+        return outputs.pop(0).encode('utf-8')
+
+    monkeypatch.setattr(setup_script, 'check_output', check_output)
+    monkeypatch.setattr(setup_script, 'sleep', lambda seconds: None)
+
+    assert setup_script.wait_links_up(['1', '2'], 'emulns', 5) == []
+    assert len(commands) == 3
+    assert commands[0] == [
+        'ip', 'netns', 'exec', 'emulns', 'ip', '-o', 'link', 'show'
+    ]
+
+
+def test_wait_links_up_timeout(setup_script, monkeypatch):
+    """
+    Check that the interfaces still down are returned after the timeout.
+    """
+    monkeypatch.setattr(
+        setup_script, 'check_output',
+        lambda command: IP_LINK_DOWN.encode('utf-8')
+    )
+
+    assert setup_script.wait_links_up(['1', '2', '3'], 'emulns', 0.2) == [
+        '2', '3'
+    ]
@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2016 Hewlett Packard Enterprise Development LP
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""
+Test suite for module topology_docker_openswitch.ovsdb.
+"""
+
+from __future__ import unicode_literals, absolute_import
+from __future__ import print_function, division
+
+from json import dumps, loads
+from socket import socketpair
+
+from pytest import raises
+
+from topology_docker_openswitch.ovsdb import (
+    JsonStreamDecoder, OvsdbBatch, OvsdbClient, OvsdbConnectionError,
+    OvsdbError, OvsdbTimeout
+)
+
+
+def encode(message):
+    return dumps(message).encode('utf-8')
+
+
+def test_stream_decoder():
+    """
+    Check that messages split across reads are decoded once complete.
+    """
+    decoder = JsonStreamDecoder()
+    data = encode({'id': 0, 'result': ['á' * 3000]}) + encode({'id': 1})
+
+    assert decoder.feed(data[:5]) == []
+    assert decoder.feed(data[5:4001]) == []
+
+    messages = decoder.feed(data[4001:])
+
+    assert [message['id'] for message in messages] == [0, 1]
+    assert messages[0]['result'] == ['á' * 3000]
+
+
+def test_client_matches_responses():
+    """
+    Check that pipelined responses are matched by id in spite of interleaved
+    notifications and echo requests.
+    """
+    client_sock, server_sock = socketpair()
+    client = OvsdbClient(client_sock)
+
+    first = client.send_request('transact', ['OpenSwitch'])
+    second = client.send_request('echo', [])
+
+    requests = JsonStreamDecoder().feed(server_sock.recv(4096))
+    assert [request['id'] for request in requests] == [first, second]
+
+    server_sock.sendall(
+        encode({'id': 'echo', 'method': 'echo', 'params': []}) +
+        encode({'id': None, 'method': 'update', 'params': ['m', {}]}) +
+        encode({'id': second, 'result': [], 'error': None}) +
+        encode({'id': first, 'result': [{'count': 1}], 'error': None})
+    )
+
+    assert client.wait_response(second, timeout=1) == []
+    assert client.wait_response(first, timeout=1) == [{'count': 1}]
+    assert client.wait_notification(timeout=0)['method'] == 'update'
+    assert client.wait_notification(timeout=0) is None
+
+    echo_reply = loads(server_sock.recv(4096).decode('utf-8'))
+    assert echo_reply == {'id': 'echo', 'result': [], 'error': None}
+
+
+def test_client_errors():
+    """
+    Check that errors and timeouts are reported with exceptions.
+    """
+    client_sock, server_sock = socketpair()
+    client = OvsdbClient(client_sock)
+
+    request_id = client.send_request('transact', ['OpenSwitch'])
+
+    with raises(OvsdbTimeout):
+        client.wait_response(request_id, timeout=0.1)
+
+    server_sock.sendall(
+        encode({'id': request_id, 'result': None, 'error': 'unknown'})
+    )
+
+    with raises(OvsdbError) as error:
+        client.wait_response(request_id, timeout=1)
+
+    assert not isinstance(error.value, OvsdbConnectionError)
+
+    request_id = client.send_request('transact', ['OpenSwitch'])
+    server_sock.recv(4096)
+    server_sock.close()
+
+    with raises(OvsdbConnectionError):
+        client.wait_response(request_id, timeout=1)
+
+
+def test_batch_commit():
+    """
+    Check that queued operations are committed in a single transaction and
+    their results decoded in order.
+    """
+    transactions = []
+    uuid = '36c5b1a5-4c5a-4e0b-9d4c-1f8e7c2d3b4a'
+
+    def transact(operations):
+        transactions.append(operations)
+        return [
+            {'count': 2},
+            {'count': 2},
+            {'rows': [{'other_config': ['map', [['mtu', '9000']]]}]},
+            {'rows': [{'_uuid': ['uuid', uuid], 'name': '1'}]},
+            {'uuid': ['uuid', uuid]}
+        ]
+
+    batch = OvsdbBatch(transact)
+    batch.set('Interface', '1', user_config={'admin': 'up'}, mtu=[9000])
+    batch.get('System', '.', 'other_config')
+    batch.list('Port', uuid)
+    batch.create('VLAN', name='VLAN10', id=10)
+
+    results = batch.commit()
+
+    assert len(transactions) == 1
+    assert [operation['op'] for operation in transactions[0]] == [
+        'update', 'mutate', 'select', 'select', 'insert'
+    ]
+    assert transactions[0][0]['where'] == [['name', '==', '1']]
+    assert transactions[0][0]['row'] == {'mtu': ['set', [9000]]}
+
+    # Only the keys given are replaced in map columns
+    assert transactions[0][1]['where'] == [['name', '==', '1']]
+    assert transactions[0][1]['mutations'] == [
+        ['user_config', 'delete', ['set', ['admin']]],
+        ['user_config', 'insert', ['map', [['admin', 'up']]]]
+    ]
+    assert transactions[0][2]['where'] == []
+    assert transactions[0][3]['where'] == [['_uuid', '==', ['uuid', uuid]]]
+
+    assert results == [
+        2, {'other_config': {'mtu': '9000'}}, [{'_uuid': uuid, 'name': '1'}],
+        uuid
+    ]
+    assert len(batch) == 0
+
+    transact_error = [{'error': 'referential integrity violation'}]
+
+    with raises(OvsdbError):
+        OvsdbBatch(lambda operations: transact_error).destroy(
+            'VLAN', 'VLAN10'
+        ).commit()
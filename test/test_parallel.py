@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2016 Hewlett Packard Enterprise Development LP
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""
+Test suite for module topology_docker_openswitch.parallel.
+"""
+
+from __future__ import unicode_literals, absolute_import
+from __future__ import print_function, division
+
+from threading import Event, Lock, Timer
+from time import sleep
+
+from topology_docker_openswitch.parallel import TaskPool, TaskTimeout
+
+
+def test_task_pool_bounds_workers():
+    """
+    Check that no more than the given number of tasks run at the same time
+    and that results and errors are kept per task.
+    """
+    lock = Lock()
+    running = [0, 0]
+
+    def task(number):
+        with lock:
+            running[0] += 1
+            running[1] = max(running)
+        sleep(0.05)
+        with lock:
+            running[0] -= 1
+        if number == 3:
+            raise ValueError(number)
+        return number * 2
+
+    pool = TaskPool(2)
+    for number in range(6):
+        pool.submit('node{}'.format(number), task, number)
+
+    results = pool.join()
+
+    assert list(results.keys()) == ['node{}'.format(n) for n in range(6)]
+    assert running[1] == 2
+    assert results['node1'].value == 2
+    assert results['node1'].error is None
+    assert isinstance(results['node3'].error, ValueError)
+    assert pool.join() == {}
+
+
+def test_task_pool_timeout():
+    """
+    Check that a hung task is abandoned and does not block the others.
+    """
+    hang = Event()
+    pool = TaskPool(2, timeout=0.2)
+
+    pool.submit('hung', hang.wait)
+    pool.submit('next', lambda: 'done')
+
+    results = pool.join()
+
+    assert isinstance(results['hung'].error, TaskTimeout)
+    assert results['next'].value == 'done'
+    assert pool.wait_abandoned(0.1) == ['hung']
+
+    hang.set()
+
+    assert pool.wait_abandoned() == []
+
+
+def test_task_pool_abandoned_writes(tmpdir):
+    """
+    Check that an abandoned task keeps its place until it ends and that it
+    does not write once its pool waited for it.
+    """
+    written = tmpdir.join('written')
+    hang = Event()
+
+    def hung():
+        hang.wait()
+        written.write('late')
+
+    pool = TaskPool(1, timeout=0.1)
+
+    pool.submit('hung', hung)
+    pool.submit('next', written.check)
+
+    # The next task can only start once the hung one ends
+    timer = Timer(0.5, hang.set)
+    timer.start()
+
+    results = pool.join()
+
+    assert isinstance(results['hung'].error, TaskTimeout)
+    assert results['next'].value is True
+
+    pool.wait_abandoned()
+    written.remove()
+    sleep(0.2)
+
+    assert not written.check()
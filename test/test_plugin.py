@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2016 Hewlett Packard Enterprise Development LP
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""
+Test suite for module topology_docker_openswitch.pytest.plugin.
+"""
+
+from __future__ import unicode_literals, absolute_import
+from __future__ import print_function, division
+
+from pytest import importorskip, raises
+
+importorskip('topology_openswitch.openswitch')
+
+from topology_docker_openswitch import openswitch  # noqa
+from topology_docker_openswitch.parallel import TaskPool  # noqa
+from topology_docker_openswitch.pytest import plugin  # noqa
+
+
+class FakeNode(object):
+
+    def __init__(self, identifier):
+        self.identifier = identifier
+        self.shared_dir = '/tmp/{}'.format(identifier)
+
+
+class FakeFixtureDef(object):
+
+    def __init__(self, argname):
+        self.argname = argname
+
+
+class FakeOutcome(object):
+
+    def __init__(self, result, excinfo=None):
+        self.result = result
+        self.excinfo = excinfo
+
+    def get_result(self):
+        return self.result
+
+
+class FakeTopology(object):
+    pass
+
+
+class FakeItem(object):
+
+    def __init__(self, topology):
+        self.funcargs = {'topology': topology}
+
+
+def run_hookwrapper(hook, outcome, *args):
+    """
+    Run a hookwrapper around a call with the given outcome.
+    """
+    wrapper = hook(*args)
+    next(wrapper)
+
+    with raises(StopIteration):
+        wrapper.send(outcome)
+
+
+def test_bringup_error_sticky(monkeypatch):
+    """
+    Check that a failed bring-up fails every test that uses the topology.
+    """
+    def fail():
+        raise RuntimeError('setup failed')
+
+    pool = TaskPool(2)
+    pool.submit(FakeNode('ops1'), fail)
+    pool.submit(FakeNode('ops2'), lambda: None)
+    monkeypatch.setattr(openswitch, 'BRINGUP_POOL', pool)
+
+    topology = FakeTopology()
+    wrapper = plugin.pytest_fixture_setup(FakeFixtureDef('topology'), None)
+    next(wrapper)
+
+    with raises(openswitch.BringUpError) as error:
+        wrapper.send(FakeOutcome(topology))
+
+    assert list(error.value.failures) == ['ops1']
+    assert topology.topology_openswitch_bringup_error is error.value
+
+    # The pool is empty after its join, the error is raised from the topology
+    for _ in range(2):
+        with raises(openswitch.BringUpError) as again:
+            run_hookwrapper(
+                plugin.pytest_runtest_setup, FakeOutcome(None),
+                FakeItem(topology)
+            )
+        assert again.value is error.value
+
+    # Other fixtures and topologies are left alone
+    run_hookwrapper(
+        plugin.pytest_fixture_setup, FakeOutcome(topology),
+        FakeFixtureDef('tmpdir'), None
+    )
+    run_hookwrapper(
+        plugin.pytest_runtest_setup, FakeOutcome(None),
+        FakeItem(FakeTopology())
+    )
@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2016 Hewlett Packard Enterprise Development LP
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""
+Test suite for module topology_docker_openswitch.pool.
+"""
+
+from __future__ import unicode_literals, absolute_import
+from __future__ import print_function, division
+
+from pytest import raises
+
+from topology.platforms.shell import NonExistingConnectionError
+
+from topology_docker_openswitch.pool import SessionPool, SessionPoolTimeout
+
+
+class FakeShell(object):
+
+    def __init__(self):
+        self.connected = None
+        self.output = None
+
+    def is_connected(self):
+        if self.connected is None:
+            raise NonExistingConnectionError('0')
+        return self.connected
+
+    def send_command(self, command, timeout=None, silent=False):
+        self.connected = True
+        self.output = command
+
+    def get_response(self, silent=False):
+        return self.output
+
+    def _handle_crash(self, connection):
+        if 'Segmentation fault' in self.output:
+            raise Exception('vtysh crashed')
+
+    def disconnect(self):
+        self.connected = False
+
+
+def test_session_pool():
+    """
+    Check that sessions are checked out one at a time and that crashed ones
+    are disconnected when checked in.
+    """
+    first, second = FakeShell(), FakeShell()
+    pool = SessionPool([first, second])
+
+    with pool.session() as shell:
+        assert shell is first
+
+        with pool.session() as other:
+            assert other is second
+
+            with raises(SessionPoolTimeout):
+                pool.checkout(timeout=0.1)
+
+    assert first.connected is None
+
+    assert pool.send_command('show version') == 'show version'
+    assert pool.send_command('Segmentation fault') == 'Segmentation fault'
+    # The session that crashed is disconnected, the other one is kept
+    assert sorted([first.connected, second.connected]) == [False, True]
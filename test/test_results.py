@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2016 Hewlett Packard Enterprise Development LP
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""
+Test suite for module topology_docker_openswitch.pytest.results.
+"""
+
+from __future__ import unicode_literals, absolute_import
+from __future__ import print_function, division
+
+from collections import OrderedDict
+from json import loads
+from os import utime
+
+from topology_docker_openswitch.pytest.results import (
+    SESSIONS_FILE, SUMMARY_FILE, item_failed, write_test_summary,
+    record_entry, prune_log_dir, summarize_boot_profiles
+)
+
+
+class FakeReport(object):
+
+    def __init__(self, outcome, duration):
+        self.outcome = outcome
+        self.duration = duration
+        self.failed = outcome == 'failed'
+
+
+class FakeItem(object):
+
+    def __init__(self, nodeid, **reports):
+        self.nodeid = nodeid
+        self.topology_openswitch_reports = reports
+
+
+class FakeNode(object):
+
+    def __init__(self, identifier, boot_profile):
+        self.identifier = identifier
+        self.boot_profile = boot_profile
+
+
+def test_item_failed():
+    """
+    Check that a test failed if its setup or its call failed.
+    """
+    assert not item_failed(object())
+    assert not item_failed(FakeItem(
+        'test', setup=FakeReport('passed', 1), call=FakeReport('passed', 2)
+    ))
+    assert item_failed(FakeItem('test', setup=FakeReport('failed', 1)))
+    assert item_failed(FakeItem(
+        'test', setup=FakeReport('passed', 1), call=FakeReport('failed', 2)
+    ))
+
+
+def test_write_test_summary(tmpdir):
+    """
+    Check that a line is appended for each test summarized.
+    """
+    log_dir = tmpdir.join('logs')
+    nodes = [FakeNode('ops1', {'boot': 1.5}), FakeNode('ops2', None)]
+
+    write_test_summary(str(log_dir), FakeItem(
+        'test_a', setup=FakeReport('passed', 1), call=FakeReport('passed', 2)
+    ), nodes)
+    write_test_summary(
+        str(log_dir), FakeItem('test_b', setup=FakeReport('failed', 1)), []
+    )
+
+    lines = [
+        loads(line) for line in log_dir.join(SUMMARY_FILE).readlines()
+    ]
+
+    assert lines == [
+        {
+            'test': 'test_a', 'outcome': 'passed', 'duration': 3,
+            'nodes': {'ops1': {'boot': 1.5}, 'ops2': None}
+        },
+        {'test': 'test_b', 'outcome': None, 'duration': 1, 'nodes': {}}
+    ]
+
+
+def test_prune_log_dir(tmpdir):
+    """
+    Check that the entries of the oldest sessions are removed together.
+    """
+    entries = [
+        ('first', 'suite_test_a_2016_01_01_00_00_00.tar.gz'),
+        ('first', 'suite_test_b_2016_01_01_00_00_01.tar.gz'),
+        ('second', 'suite_test_a_2016_01_02_00_00_00'),
+        ('third', 'suite_test_a_2016_01_03_00_00_00.tar.gz'),
+        ('third', 'suite_test_b_2016_01_03_00_00_01.tar.gz')
+    ]
+
+    for mtime, (session, name) in enumerate(entries):
+        if name.endswith('.tar.gz'):
+            tmpdir.join(name).write('x' * 10)
+        else:
+            tmpdir.join(name).ensure_dir().join('log').write('x' * 10)
+        utime(str(tmpdir.join(name)), (mtime, mtime))
+        record_entry(str(tmpdir), session, name)
+
+    # Not an entry, and an entry not recorded in the sessions file
+    tmpdir.join(SUMMARY_FILE).write('')
+    tmpdir.join('suite_test_c_2015_01_01_00_00_00').ensure_dir()
+    utime(str(tmpdir.join('suite_test_c_2015_01_01_00_00_00')), (0, 0))
+
+    assert prune_log_dir(str(tmpdir), max_sessions=3) == [
+        str(tmpdir.join('suite_test_c_2015_01_01_00_00_00'))
+    ]
+
+    assert sorted(prune_log_dir(str(tmpdir), max_bytes=35)) == [
+        str(tmpdir.join(name)) for _, name in entries[:2]
+    ]
+
+    assert [
+        loads(line)['entry']
+        for line in tmpdir.join(SESSIONS_FILE).readlines()
+    ] == [name for _, name in entries[2:]]
+
+    # The newest session is kept even if it is over the limit
+    assert prune_log_dir(str(tmpdir), max_sessions=0, max_bytes=5) == [
+        str(tmpdir.join(entries[2][1]))
+    ]
+    assert sorted(tmpdir.listdir()) == sorted([
+        tmpdir.join(SESSIONS_FILE), tmpdir.join(SUMMARY_FILE),
+        tmpdir.join(entries[3][1]), tmpdir.join(entries[4][1])
+    ])
+
+
+def test_summarize_boot_profiles():
+    """
+    Check the minimum, median and 95th percentile of each boot phase with odd
+    and even numbers of nodes.
+    """
+    def profile(netns, db_sock):
+        # The boot profiles hold the seconds elapsed at the end of each phase
+        return OrderedDict([('netns', netns), ('db_sock', netns + db_sock)])
+
+    odd = [profile(3, 10), profile(1, 30), profile(2, 20)]
+
+    assert summarize_boot_profiles(odd) == OrderedDict([
+        ('netns', (1, 2, 3)), ('db_sock', (10, 20, 30))
+    ])
+
+    even = odd + [profile(5, 40)]
+
+    assert summarize_boot_profiles(even) == OrderedDict([
+        ('netns', (1, 2.5, 5)), ('db_sock', (10, 25.0, 40))
+    ])
+    assert list(summarize_boot_profiles(even)) == ['netns', 'db_sock']
+
+    assert summarize_boot_profiles([]) == OrderedDict()
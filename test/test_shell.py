@@ -0,0 +1,236 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2016 Hewlett Packard Enterprise Development LP
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""
+Test suite for module topology_docker_openswitch.shell.
+"""
+
+from __future__ import unicode_literals, absolute_import
+from __future__ import print_function, division
+
+from threading import Event
+
+from pexpect import TIMEOUT
+from pytest import importorskip, raises
+
+vtysh = importorskip('topology_openswitch.vtysh')
+
+from topology_docker_openswitch.shell import (  # noqa
+    PrewarmShellMixin, OpenSwitchVtyshShell, VtyshExitedError
+)
+
+
+class LocalVtyshShell(OpenSwitchVtyshShell):
+    """
+    vtysh shell that runs bash locally, with a nested sh in place of vtysh.
+    """
+
+    def __init__(self):
+        super(LocalVtyshShell, self).__init__('local')
+        self._timeout = 5
+
+    def _get_connect_command(self):
+        return 'env PS1="$ " bash --norc --noprofile'
+
+    def _determine_set_prompt(self, connection=None):
+        spawn = self._get_connection(connection)
+
+        # The prompt is split so its echo does not match it
+        prompt = vtysh.VTYSH_FORCED_PROMPT
+        spawn.sendline("env PS1='{}''{}' sh".format(prompt[:4], prompt[4:]))
+        spawn.expect(prompt)
+
+        return True
+
+
+class FakeShell(object):
+    """
+    Shell whose connections are opened once the test lets them.
+    """
+
+    def __init__(self, error=None):
+        self.error = error
+        self.opening = Event()
+        self.proceed = Event()
+        self.connections = []
+        self.commands = []
+
+    def connect(self, connection=None):
+        self.opening.set()
+        assert self.proceed.wait(5)
+
+        if self.error is not None:
+            raise self.error
+
+        self.connections.append(connection)
+
+    def is_connected(self, connection=None):
+        return connection in self.connections
+
+    def send_command(self, command, connection=None):
+        self.commands.append((connection, command))
+
+    def disconnect(self, connection=None):
+        self.connections.remove(connection)
+
+
+class PrewarmShell(PrewarmShellMixin, FakeShell):
+    pass
+
+
+def test_prewarm():
+    """
+    Check that a connection is opened in the background and waited for when
+    the shell is first used.
+    """
+    shell = PrewarmShell()
+
+    shell.prewarm(connection='0')
+
+    # prewarm returns while the connection is still being opened
+    assert shell.opening.wait(5)
+    assert shell.connections == []
+
+    shell.proceed.set()
+    shell.send_command('show version', connection='0')
+
+    assert shell.connections == ['0']
+    assert shell.commands == [('0', 'show version')]
+    assert shell.is_connected(connection='0')
+
+
+def test_prewarm_error():
+    """
+    Check that the error of a pre-warmed connection is raised when the shell
+    is first used, and only once.
+    """
+    shell = PrewarmShell(error=RuntimeError('unable to connect'))
+    shell.proceed.set()
+
+    shell.prewarm()
+
+    with raises(RuntimeError) as error:
+        shell.send_command('show version')
+
+    assert str(error.value) == 'unable to connect'
+    assert shell.commands == []
+
+    assert not shell.is_connected()
+
+
+def test_send_command_unconnected():
+    """
+    Check that the first command of a shell is answered at the vtysh prompt.
+    """
+    shell = LocalVtyshShell()
+
+    shell.send_command('echo hello', silent=True)
+
+    assert shell.get_response(silent=True) == 'hello'
+
+    shell.disconnect()
+
+
+def test_send_command_exit():
+    """
+    Check that vtysh exiting or crashing is raised when the bash prompt is
+    found instead of its one.
+    """
+    shell = LocalVtyshShell()
+
+    with raises(VtyshExitedError):
+        shell.send_command('exit', silent=True)
+
+    shell.disconnect()
+
+    with raises(Exception) as error:
+        shell.send_command('kill -SEGV $$', silent=True)
+
+    assert not isinstance(error.value, (TIMEOUT, VtyshExitedError))
+
+    shell.disconnect()
+
+
+def test_send_commands():
+    """
+    Check that the commands of each window are written at once.
+    """
+    shell = LocalVtyshShell()
+    shell.BATCH_WINDOW = 32
+    shell.connect()
+
+    spawn = shell._get_connection()
+    writes = []
+    send = spawn.send
+
+    def counted_send(data):
+        writes.append(data)
+        return send(data)
+
+    spawn.send = counted_send
+
+    # Four commands of 7 bytes, with their newlines, fit in each window
+    responses = shell.send_commands(
+        ['echo {}'.format(index) for index in range(10)], silent=True
+    )
+
+    assert responses == [str(index) for index in range(10)]
+    assert len(writes) == 3
+
+    shell.disconnect()
+
+
+def test_send_commands_crash(tmpdir):
+    """
+    Check that a crash stops the writing of the following windows.
+    """
+    shell = LocalVtyshShell()
+
+    commands = [
+        'echo before',
+        'kill -SEGV $$',
+        'touch {}'.format(tmpdir.join('same_window')),
+        'touch {}'.format(tmpdir.join('next_window'))
+    ]
+    shell.BATCH_WINDOW = sum(len(command) + 1 for command in commands[:3])
+
+    with raises(Exception) as error:
+        shell.send_commands(commands, silent=True)
+
+    assert not isinstance(error.value, (TIMEOUT, VtyshExitedError))
+
+    # The command that follows the crash in its window is discarded by bash
+    shell.send_command(
+        'true', matches=[vtysh.BASH_FORCED_PROMPT], silent=True
+    )
+
+    assert not tmpdir.join('same_window').check()
+    assert not tmpdir.join('next_window').check()
+
+    shell.disconnect()
+
+
+def test_send_commands_exit():
+    """
+    Check that vtysh exiting in a window is raised at once.
+    """
+    shell = LocalVtyshShell()
+
+    with raises(VtyshExitedError):
+        shell.send_commands(['echo before', 'exit', 'echo after'], silent=True)
+
+    shell.disconnect()